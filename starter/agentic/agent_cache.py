@@ -0,0 +1,135 @@
+from langchain.agents import create_agent
+from langchain.agents.middleware import ModelRequest, dynamic_prompt
+from langchain.chat_models import BaseChatModel
+from langchain_core.messages import SystemMessage
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+from dotenv import load_dotenv
+
+import hashlib
+import json
+import os
+import threading
+
+load_dotenv()
+
+AGENT_CACHE_SIZE = int(os.getenv("AGENT_CACHE_SIZE", "256"))
+
+
+@dataclass(frozen=True)
+class AgentContext:
+    """Per-turn data handed to a compiled agent when it is invoked."""
+
+    external_user_id: Optional[str] = None
+
+
+@dynamic_prompt
+def with_agent_context(request: ModelRequest) -> str:
+    system_prompt = request.system_prompt or ""
+    context = request.runtime.context
+    if isinstance(context, AgentContext) and context.external_user_id:
+        system_prompt += (
+            f"\n\nUser ID in the customers system: {context.external_user_id}"
+        )
+    return system_prompt
+
+
+def fingerprint(value: Any) -> str:
+    return hashlib.sha1(
+        json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def tools_fingerprint(tools: list) -> str:
+    # Tools are bound to the MCP session they were loaded with, so an agent is
+    # only reused with the very same tool objects. The cached agent keeps them
+    # alive, so their ids cannot be taken by other tools in the meantime.
+    return fingerprint(sorted([tool.name, id(tool)] for tool in tools))
+
+
+def model_fingerprint(llm: BaseChatModel) -> str:
+    return fingerprint(
+        [type(llm).__name__, getattr(llm, "_identifying_params", repr(llm))]
+    )
+
+
+class CompiledAgentCache:
+    """LRU cache of compiled agents, so `create_agent` runs once per agent setup.
+
+    Agents are keyed by node, account, tool set, model and system prompt.
+    Per-turn data such as the user ID is passed as `AgentContext` at invocation
+    time, so one compiled agent serves all turns and sessions of an account.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._agents: OrderedDict[tuple, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        node: str,
+        account_id: Optional[str],
+        llm: BaseChatModel,
+        system_prompt: str | SystemMessage,
+        tools: Optional[list] = None,
+        response_format: Any = None,
+    ):
+        tools = tools or []
+        prompt_text = (
+            system_prompt.text
+            if isinstance(system_prompt, SystemMessage)
+            else system_prompt
+        )
+        key = (
+            node,
+            account_id,
+            tools_fingerprint(tools),
+            model_fingerprint(llm),
+            fingerprint(prompt_text),
+        )
+
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is not None:
+                self._agents.move_to_end(key)
+                self.hits += 1
+                return agent
+            self.misses += 1
+
+        agent = create_agent(
+            model=llm,
+            system_prompt=system_prompt,
+            tools=tools,
+            response_format=response_format,
+            middleware=[with_agent_context],
+            context_schema=AgentContext,
+        )
+
+        if self.max_entries > 0:
+            with self._lock:
+                agent = self._agents.setdefault(key, agent)
+                self._agents.move_to_end(key)
+                while len(self._agents) > self.max_entries:
+                    self._agents.popitem(last=False)
+
+        return agent
+
+    def clear(self):
+        with self._lock:
+            self._agents.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "agents": len(self._agents),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+compiled_agents = CompiledAgentCache(max_entries=AGENT_CACHE_SIZE)
@@ -1,7 +1,8 @@
 from starter.agentic.state import UdaHubState
+from starter.agentic.nodes.context_management import context_messages
 from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import SystemMessage, AIMessage
-from langchain.agents import create_agent
+from starter.agentic.agent_cache import compiled_agents
 from starter.agentic.mcp_tool_utils import McpToolFilter
 from starter.agentic.agents.agent_response import AgentResponse
 from textwrap import dedent
@@ -26,19 +27,23 @@ async def faq_agent_node(state: UdaHubState, config: RunnableConfig) -> UdaHubSt
 
         Rules:
         - Use the tools instead of the LLMs knowledge to answer questions.
+        - If you need to search for several things at once, use a batch query tool with all search queries instead of calling a query tool several times.
         - If you need more information from the user, ask the user for it instead of making assumptions.
         - If you cannot find what the users looking for, say that you are sorry and that you cannot help with this request.
         - If the user askes to do something that is outside of your capabilities, set the 'request_handoff' flag to true in your response.
         - Always ask the user if the request is complete or if they need further assistance. Only if they confirm that they are done, set the 'task_complete' flag to true in your response.
     """)
-    agent = create_agent(
-        model=llm,  # ty:ignore[invalid-argument-type]
+    agent = compiled_agents.get(
+        "faq",
+        account_id,
+        llm,  # ty:ignore[invalid-argument-type]
         system_prompt=SystemMessage(system_prompt),
         tools=faq_tools,
         response_format=AgentResponse,
     )
     response = await agent.ainvoke(
-        {"messages": state.get("messages", [])}, config={"recursion_limit": 10}
+        {"messages": context_messages(state, config, "faq")},
+        config={"recursion_limit": 10},
     )
     structured_response: AgentResponse = response["structured_response"]
 
@@ -1,7 +1,8 @@
 from starter.agentic.state import UdaHubState
+from starter.agentic.nodes.context_management import context_messages
 from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import SystemMessage, AIMessage
-from langchain.agents import create_agent
+from starter.agentic.agent_cache import AgentContext, compiled_agents
 from starter.agentic.mcp_tool_utils import McpToolFilter
 from starter.agentic.agents.agent_response import AgentResponse
 from textwrap import dedent
@@ -35,17 +36,19 @@ async def subscription_agent_node(
         - If the user askes to do something that is outside of your capabilities, set the 'request_handoff' flag to true in your response.
         - Always ask the user if the request is complete or if they need further assistance. Only if they confirm that they are done, set the 'task_complete' flag to true in your response.
         - Before you perform any action that changes the users subscription, always ask the user for confirmation. Only after they confirm, perform the action.
-
-        User ID in the customers system: {external_user_id}
     """)
-    agent = create_agent(
-        model=llm,  # ty:ignore[invalid-argument-type]
+    agent = compiled_agents.get(
+        "subscription",
+        account_id,
+        llm,  # ty:ignore[invalid-argument-type]
         system_prompt=SystemMessage(system_prompt),
         tools=subscription_tools,
         response_format=AgentResponse,
     )
     response = await agent.ainvoke(
-        {"messages": state.get("messages", [])}, config={"recursion_limit": 10}
+        {"messages": context_messages(state, config, "subscription")},
+        config={"recursion_limit": 10},
+        context=AgentContext(external_user_id=external_user_id),
     )
     structured_response: AgentResponse = response["structured_response"]
     return {
@@ -1,5 +1,12 @@
 from typing import Any, Callable, Optional, Protocol, Sequence
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+
+import asyncio
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class ChatInterface(Protocol):
@@ -10,6 +17,47 @@ class ChatInterface(Protocol):
         """Read a message"""
 
 
+class AsyncChatInterface(Protocol):
+    async def next_message(self) -> Optional[str]:
+        """Return next user message, or None if the stream is finished."""
+
+    async def read_message(self, message: str):
+        """Read a message"""
+
+
+async def anext_message(
+    chat_interface: ChatInterface | AsyncChatInterface,
+) -> Optional[str]:
+    """Get the next user message without blocking the event loop.
+
+    Sync chat interfaces are called on a worker thread.
+    """
+    if inspect.iscoroutinefunction(chat_interface.next_message):
+        return await chat_interface.next_message()
+    return await asyncio.to_thread(chat_interface.next_message)
+
+
+async def aread_message(
+    chat_interface: ChatInterface | AsyncChatInterface, message: str
+):
+    if inspect.iscoroutinefunction(chat_interface.read_message):
+        await chat_interface.read_message(message)
+    else:
+        await asyncio.to_thread(chat_interface.read_message, message)
+
+
+def print_status(config: RunnableConfig, message: str):
+    """Print a status line of the chat on the console.
+
+    Quiet chats, e.g. the sessions of the chat gateway, are not held on the
+    console, so their status lines are logged instead.
+    """
+    if config.get("configurable", {}).get("quiet", False):
+        logger.info(message.strip())
+    else:
+        print(message)
+
+
 class ListChatInterface:
     messages: Sequence[str]
     _i: int = 0
@@ -69,12 +117,24 @@ class LlmChatInterface:
         self._history = [SystemMessage(content=system)]
 
     def next_message(self) -> Optional[str]:
-        if self._turns_left <= 0:
+        if not self._take_turn():
             return None
+        return self._accept(self._llm.invoke(self._history))
+
+    async def anext_message(self) -> Optional[str]:
+        """Like `next_message`, but awaits the LLM instead of blocking on it."""
+        if not self._take_turn():
+            return None
+        return self._accept(await self._llm.ainvoke(self._history))
+
+    def _take_turn(self) -> bool:
+        if self._turns_left <= 0:
+            return False
 
         self._turns_left -= 1
+        return True
 
-        result = self._llm.invoke(self._history)
+    def _accept(self, result: Any) -> Optional[str]:
         content = getattr(result, "content", None)
         if content is None:
             # Some models return a dict-like result
@@ -99,3 +159,51 @@ class LlmChatInterface:
         msg = str(message)
         if msg.strip():
             self._history.append(self._AIMessage(content=msg))
+
+
+class AsyncListChatInterface:
+    def __init__(self, messages: Sequence[str]):
+        self._chat_interface = ListChatInterface(messages)
+
+    async def next_message(self) -> Optional[str]:
+        return self._chat_interface.next_message()
+
+    async def read_message(self, message: str):
+        self._chat_interface.read_message(message)
+
+
+class AsyncConsoleChatInterface:
+    def __init__(self):
+        self._chat_interface = ConsoleChatInterface()
+
+    async def next_message(self) -> Optional[str]:
+        # input() blocks, so it waits on a worker thread instead of the loop.
+        return await asyncio.to_thread(self._chat_interface.next_message)
+
+    async def read_message(self, message: str):
+        self._chat_interface.read_message(message)
+
+
+class AsyncLlmChatInterface:
+    def __init__(
+        self,
+        llm: Any,
+        instructions: str,
+        *,
+        max_turns: int = 25,
+        end_token: str = "",
+        on_generated: Callable[[str], None] | None = None,
+    ):
+        self._chat_interface = LlmChatInterface(
+            llm,
+            instructions,
+            max_turns=max_turns,
+            end_token=end_token,
+            on_generated=on_generated,
+        )
+
+    async def next_message(self) -> Optional[str]:
+        return await self._chat_interface.anext_message()
+
+    async def read_message(self, message: str):
+        self._chat_interface.read_message(message)
@@ -0,0 +1,261 @@
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.sqlite import SqliteSaver
+from starter.data.sqlite_setup import SQLITE_PRAGMAS
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional, Sequence
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+load_dotenv()
+
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "starter/data/core/checkpoints.db")
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "5"))
+CHECKPOINT_IDLE_TTL = float(os.getenv("CHECKPOINT_IDLE_TTL", "86400"))
+CHECKPOINT_COMPACTION_INTERVAL = float(
+    os.getenv("CHECKPOINT_COMPACTION_INTERVAL", "600")
+)
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class BoundedSqliteSaver(SqliteSaver):
+    """SQLite checkpointer that keeps its size bounded.
+
+    Only the last `keep_last` checkpoints of a thread are kept, and threads
+    that were idle for longer than `idle_ttl` seconds are evicted by
+    `compact()`. The async methods run the sync ones on a thread, so the saver
+    is not bound to an event loop.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, keep_last: int, idle_ttl: float):
+        super().__init__(conn)
+        self.keep_last = max(keep_last, 1)
+        self.idle_ttl = idle_ttl
+        self._compaction_stop: Optional[threading.Event] = None
+        self._compaction_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_path(
+        cls,
+        path: str = CHECKPOINT_DB_PATH,
+        keep_last: int = CHECKPOINT_KEEP_LAST,
+        idle_ttl: float = CHECKPOINT_IDLE_TTL,
+    ) -> "BoundedSqliteSaver":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # The saver serializes all access to the connection with its lock.
+        conn = sqlite3.connect(path, check_same_thread=False)
+        # Freed pages are returned to the file system by compact(). The mode
+        # only applies to new databases, so an existing file created without
+        # it is rebuilt once with VACUUM.
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        for name, value in SQLITE_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return cls(conn, keep_last=keep_last, idle_ttl=idle_ttl)
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+
+        super().setup()
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS thread_activity (
+                thread_id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_thread_activity_updated_at
+                ON thread_activity (updated_at);
+            """
+        )
+
+    def _prune(self, cur: sqlite3.Cursor, thread_id: str, checkpoint_ns: str) -> int:
+        # Checkpoint ids sort by time, so everything older than the
+        # `keep_last`-th newest checkpoint can go.
+        cutoff = cur.execute(
+            "SELECT checkpoint_id FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last - 1),
+        ).fetchone()
+        if cutoff is None:
+            return 0
+
+        if checkpoint_ns:
+            scope, parameters = "checkpoint_ns = ?", (thread_id, checkpoint_ns)
+        else:
+            # Sub-agents checkpoint under a new namespace on every turn, so the
+            # root cutoff applies to the checkpoints of all namespaces.
+            scope, parameters = "1 = 1", (thread_id,)
+        parameters = (*parameters, cutoff[0])
+        cur.execute(
+            f"DELETE FROM writes WHERE thread_id = ? AND {scope} AND checkpoint_id < ?",
+            parameters,
+        )
+        return cur.execute(
+            f"DELETE FROM checkpoints "
+            f"WHERE thread_id = ? AND {scope} AND checkpoint_id < ?",
+            parameters,
+        ).rowcount
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT INTO thread_activity (thread_id, updated_at) VALUES (?, ?) "
+                "ON CONFLICT (thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (thread_id, time.time()),
+            )
+            self._prune(cur, thread_id, checkpoint_ns)
+
+        return next_config
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute(
+                "DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),)
+            )
+
+    def evict_idle_threads(self) -> int:
+        """Delete all threads that were idle for longer than `idle_ttl` seconds."""
+        with self.cursor(transaction=False) as cur:
+            thread_ids = [
+                row[0]
+                for row in cur.execute(
+                    "SELECT thread_id FROM thread_activity WHERE updated_at < ?",
+                    (time.time() - self.idle_ttl,),
+                )
+            ]
+
+        for thread_id in thread_ids:
+            self.delete_thread(thread_id)
+        return len(thread_ids)
+
+    def compact(self) -> dict:
+        """Evict idle threads, prune every thread and give free pages back."""
+        evicted_threads = self.evict_idle_threads()
+
+        pruned_checkpoints = 0
+        with self.cursor() as cur:
+            threads = cur.execute(
+                "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints"
+            ).fetchall()
+            for thread_id, checkpoint_ns in threads:
+                pruned_checkpoints += self._prune(cur, thread_id, checkpoint_ns)
+
+        with self.lock:
+            # SQLite frees one page per result row, so all rows must be read.
+            self.conn.execute("PRAGMA incremental_vacuum").fetchall()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        return {
+            "evicted_threads": evicted_threads,
+            "pruned_checkpoints": pruned_checkpoints,
+        }
+
+    def start_compaction(self, interval: float = CHECKPOINT_COMPACTION_INTERVAL):
+        """Run `compact()` every `interval` seconds on a daemon thread."""
+        if interval <= 0 or self._compaction_stop is not None:
+            return
+
+        self._compaction_stop = threading.Event()
+
+        def run(stop: threading.Event):
+            while not stop.wait(interval):
+                self.compact()
+
+        self._compaction_thread = threading.Thread(
+            target=run,
+            args=(self._compaction_stop,),
+            name="checkpoint-compaction",
+            daemon=True,
+        )
+        self._compaction_thread.start()
+
+    def stop_compaction(self):
+        """Stop the compaction job and wait for a running `compact()` to finish."""
+        if self._compaction_stop is not None:
+            self._compaction_stop.set()
+            self._compaction_stop = None
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+            self._compaction_thread = None
+
+    def close(self):
+        self.stop_compaction()
+        with self.lock:
+            self.conn.close()
+
+    def stats(self) -> dict:
+        with self.cursor(transaction=False) as cur:
+            threads = cur.execute("SELECT COUNT(*) FROM thread_activity").fetchone()
+            checkpoints = cur.execute("SELECT COUNT(*) FROM checkpoints").fetchone()
+            writes = cur.execute("SELECT COUNT(*) FROM writes").fetchone()
+        return {
+            "threads": threads[0],
+            "checkpoints": checkpoints[0],
+            "writes": writes[0],
+            "keep_last": self.keep_last,
+            "idle_ttl": self.idle_ttl,
+        }
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
@@ -0,0 +1,347 @@
+"""HTTP gateway that hosts many concurrent UDA-Hub chat sessions in one process.
+
+All sessions share the agent's graph, MCP sessions and LLM client. Every
+session has a bounded inbox for user messages and a bounded outbox for the
+agent's messages, which are streamed to the client with server-sent events.
+
+    python -m starter.agentic.gateway
+
+    POST   /sessions                    {"account_id", "external_user_id", "ticket_id"?, "thread_id"?}
+    POST   /sessions/{thread_id}/messages {"content"}
+    GET    /sessions/{thread_id}/events   (text/event-stream)
+    DELETE /sessions/{thread_id}
+    GET    /sessions
+"""
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from sse_starlette.sse import EventSourceResponse
+from langchain_mcp_adapters.client import StreamableHttpConnection
+from starter.agentic.udahub import UdaHubAgent, McpServerList
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+from typing import AsyncIterator, Optional
+
+import asyncio
+import json
+import os
+import time
+import uuid
+import uvicorn
+
+load_dotenv()
+
+CHAT_GATEWAY_HOST = os.getenv("CHAT_GATEWAY_HOST", "127.0.0.1")
+CHAT_GATEWAY_PORT = int(os.getenv("CHAT_GATEWAY_PORT", "8010"))
+CHAT_GATEWAY_MAX_SESSIONS = int(os.getenv("CHAT_GATEWAY_MAX_SESSIONS", "500"))
+CHAT_GATEWAY_QUEUE_SIZE = int(os.getenv("CHAT_GATEWAY_QUEUE_SIZE", "16"))
+CHAT_GATEWAY_IDLE_TIMEOUT = float(os.getenv("CHAT_GATEWAY_IDLE_TIMEOUT", "900"))
+CHAT_GATEWAY_END_GRACE = float(os.getenv("CHAT_GATEWAY_END_GRACE", "60"))
+
+
+class GatewayFullError(Exception):
+    pass
+
+
+class SessionNotFoundError(Exception):
+    pass
+
+
+class SessionConflictError(Exception):
+    pass
+
+
+class QueueChatInterface:
+    """Async chat interface that connects a graph run to the queues of a session.
+
+    A full outbox holds the graph back until the client has caught up.
+    """
+
+    def __init__(self, queue_size: int, idle_timeout: float):
+        self.idle_timeout = idle_timeout
+        self.inbox: asyncio.Queue[Optional[str]] = asyncio.Queue(queue_size)
+        self.outbox: asyncio.Queue[dict] = asyncio.Queue(queue_size)
+
+    async def next_message(self) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self.inbox.get(), self.idle_timeout)
+        except TimeoutError:
+            return None
+
+    async def read_message(self, message: str):
+        await asyncio.wait_for(
+            self.outbox.put({"type": "message", "content": message}),
+            self.idle_timeout,
+        )
+
+
+@dataclass
+class ChatSession:
+    thread_id: str
+    account_id: str
+    external_user_id: str
+    chat_interface: QueueChatInterface
+    ticket_id: Optional[str] = None
+    task: Optional[asyncio.Task] = None
+    created_at: float = field(default_factory=time.time)
+    # Set once the chat is over and once a client received its end event.
+    ended: bool = False
+    end_consumed: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class ChatGateway:
+    def __init__(
+        self,
+        agent: UdaHubAgent,
+        max_sessions: int = CHAT_GATEWAY_MAX_SESSIONS,
+        queue_size: int = CHAT_GATEWAY_QUEUE_SIZE,
+        idle_timeout: float = CHAT_GATEWAY_IDLE_TIMEOUT,
+        end_grace: float = CHAT_GATEWAY_END_GRACE,
+    ):
+        self.agent = agent
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.idle_timeout = idle_timeout
+        self.end_grace = end_grace
+        self.sessions: dict[str, ChatSession] = {}
+
+    def open_session(
+        self,
+        account_id: str,
+        external_user_id: str,
+        ticket_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
+    ) -> ChatSession:
+        for name, value in [
+            ("account_id", account_id),
+            ("external_user_id", external_user_id),
+        ]:
+            if not isinstance(value, str) or not value.strip():
+                raise ValueError(f"'{name}' must be a non-empty string.")
+        for name, value in [("ticket_id", ticket_id), ("thread_id", thread_id)]:
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"'{name}' must be a string.")
+
+        thread_id = thread_id or str(uuid.uuid4())
+        session = self.sessions.get(thread_id)
+        if session is not None and session.ended:
+            # The chat of this thread is over, the thread can be continued
+            # with a new session.
+            self.sessions.pop(thread_id)
+        elif session is not None:
+            if (session.account_id, session.external_user_id) != (
+                account_id,
+                external_user_id,
+            ):
+                raise SessionConflictError(
+                    f"Session {thread_id} belongs to another user."
+                )
+            return session
+
+        if len(self.sessions) >= self.max_sessions:
+            raise GatewayFullError(
+                f"The gateway already serves {self.max_sessions} sessions."
+            )
+
+        session = ChatSession(
+            thread_id=thread_id,
+            account_id=account_id,
+            external_user_id=external_user_id,
+            ticket_id=ticket_id,
+            chat_interface=QueueChatInterface(self.queue_size, self.idle_timeout),
+        )
+        session.task = asyncio.create_task(self._run(session))
+        self.sessions[thread_id] = session
+        return session
+
+    async def _run(self, session: ChatSession):
+        end_event = {"type": "end"}
+        try:
+            continuation = await self.agent.start_chat(
+                account_id=session.account_id,
+                external_user_id=session.external_user_id,
+                ticket_id=session.ticket_id,
+                thread_id=session.thread_id,
+                chat_interface=session.chat_interface,
+                quiet=True,
+            )
+            end_event["ticket_id"] = continuation.get("ticket_id")
+
+        except Exception as e:
+            end_event["error"] = str(e)
+
+        finally:
+            session.ended = True
+            try:
+                await asyncio.wait_for(
+                    session.chat_interface.outbox.put(end_event), self.idle_timeout
+                )
+                # The session stays registered until its client received the
+                # end event, so a client that connects late still gets the
+                # queued messages.
+                await asyncio.wait_for(session.end_consumed.wait(), self.end_grace)
+            except TimeoutError:
+                pass
+            if self.sessions.get(session.thread_id) is session:
+                self.sessions.pop(session.thread_id)
+
+    def get_session(self, thread_id: str) -> ChatSession:
+        session = self.sessions.get(thread_id)
+        if session is None:
+            raise SessionNotFoundError(f"No open session {thread_id}.")
+        return session
+
+    def send_message(self, thread_id: str, content: str):
+        """Queue a user message. Raises asyncio.QueueFull if the inbox is full."""
+        # An empty message would end the chat, which is up to close_session.
+        if not isinstance(content, str) or not content.strip():
+            raise ValueError("The message needs a non-empty 'content'.")
+        session = self.get_session(thread_id)
+        if session.ended:
+            raise SessionNotFoundError(f"The chat of session {thread_id} is over.")
+        session.chat_interface.inbox.put_nowait(content)
+
+    def close_session(self, thread_id: str):
+        # An empty message ends the chat, like in the console.
+        inbox = self.get_session(thread_id).chat_interface.inbox
+        while True:
+            try:
+                inbox.put_nowait(None)
+                return
+            except asyncio.QueueFull:
+                inbox.get_nowait()
+
+    async def events(self, thread_id: str) -> AsyncIterator[dict]:
+        session = self.get_session(thread_id)
+        while True:
+            event = await session.chat_interface.outbox.get()
+            yield event
+            if event["type"] == "end":
+                session.end_consumed.set()
+                return
+
+    async def aclose(self):
+        for thread_id, session in list(self.sessions.items()):
+            self.close_session(thread_id)
+            # Nobody waits for the end events on shutdown.
+            session.end_consumed.set()
+        tasks = [session.task for session in self.sessions.values() if session.task]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.agent.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "queue_size": self.queue_size,
+            "queues": {
+                thread_id: {
+                    "inbox": session.chat_interface.inbox.qsize(),
+                    "outbox": session.chat_interface.outbox.qsize(),
+                }
+                for thread_id, session in self.sessions.items()
+            },
+        }
+
+
+async def read_json_object(request: Request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ValueError("The request body is not valid JSON.") from None
+    if not isinstance(body, dict):
+        raise ValueError("The request body must be a JSON object.")
+    return body
+
+
+def create_app(gateway: ChatGateway) -> Starlette:
+    async def open_session(request: Request) -> JSONResponse:
+        try:
+            body = await read_json_object(request)
+            session = gateway.open_session(
+                account_id=body["account_id"],
+                external_user_id=body["external_user_id"],
+                ticket_id=body.get("ticket_id"),
+                thread_id=body.get("thread_id"),
+            )
+        except KeyError as e:
+            return JSONResponse({"error": f"Missing field {e}"}, status_code=400)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except SessionConflictError as e:
+            return JSONResponse({"error": str(e)}, status_code=409)
+        except GatewayFullError as e:
+            return JSONResponse({"error": str(e)}, status_code=503)
+
+        return JSONResponse({"thread_id": session.thread_id}, status_code=201)
+
+    async def send_message(request: Request) -> JSONResponse:
+        try:
+            body = await read_json_object(request)
+            gateway.send_message(request.path_params["thread_id"], body.get("content"))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except SessionNotFoundError as e:
+            return JSONResponse({"error": str(e)}, status_code=404)
+        except asyncio.QueueFull:
+            return JSONResponse(
+                {"error": "Too many pending messages, retry later."},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+
+        return JSONResponse({"queued": True}, status_code=202)
+
+    async def stream_events(request: Request):
+        thread_id = request.path_params["thread_id"]
+        try:
+            gateway.get_session(thread_id)
+        except SessionNotFoundError as e:
+            return JSONResponse({"error": str(e)}, status_code=404)
+
+        async def event_stream():
+            async for event in gateway.events(thread_id):
+                yield {"event": event["type"], "data": json.dumps(event)}
+
+        return EventSourceResponse(event_stream())
+
+    async def close_session(request: Request) -> JSONResponse:
+        try:
+            gateway.close_session(request.path_params["thread_id"])
+        except SessionNotFoundError as e:
+            return JSONResponse({"error": str(e)}, status_code=404)
+
+        return JSONResponse({"closing": True}, status_code=202)
+
+    async def list_sessions(request: Request) -> JSONResponse:
+        return JSONResponse(gateway.stats())
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        yield
+        await gateway.aclose()
+
+    return Starlette(
+        routes=[
+            Route("/sessions", open_session, methods=["POST"]),
+            Route("/sessions", list_sessions, methods=["GET"]),
+            Route("/sessions/{thread_id}/messages", send_message, methods=["POST"]),
+            Route("/sessions/{thread_id}/events", stream_events, methods=["GET"]),
+            Route("/sessions/{thread_id}", close_session, methods=["DELETE"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+if __name__ == "__main__":
+    mcp_servers = McpServerList().add_connection(
+        "cultpass",
+        StreamableHttpConnection(
+            url="http://localhost:8003/mcp", transport="streamable_http"
+        ),
+    )
+    gateway = ChatGateway(UdaHubAgent(mcp_servers))
+    uvicorn.run(create_app(gateway), host=CHAT_GATEWAY_HOST, port=CHAT_GATEWAY_PORT)
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from dotenv import load_dotenv
+
+import os
+import threading
+import time
+
+load_dotenv()
+
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "4096"))
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "300"))
+
+
+class IdentityCache:
+    """In-process LRU cache with TTL for validated users and account metadata.
+
+    A user validated once is not validated again by any session until the
+    entry expires or is invalidated, e.g. because the customer blocked the
+    user.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: tuple[Hashable, ...]) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, key: tuple[Hashable, ...], value: Any):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_account(self, account_id: str) -> Optional[dict]:
+        return self._get(("account", account_id))
+
+    def put_account(self, account_id: str, account: dict):
+        self._put(("account", account_id), account)
+
+    def get_user(self, account_id: str, external_user_id: str) -> Optional[dict]:
+        return self._get(("user", account_id, external_user_id))
+
+    def put_user(self, account_id: str, external_user_id: str, user: dict):
+        self._put(("user", account_id, external_user_id), user)
+
+    def invalidate_user(self, account_id: str, external_user_id: str):
+        with self._lock:
+            self._entries.pop(("user", account_id, external_user_id), None)
+
+    def invalidate_account(self, account_id: str):
+        """Drop the account and all validated users of it."""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == account_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+identity_cache = IdentityCache(
+    max_entries=IDENTITY_CACHE_SIZE, ttl_seconds=IDENTITY_CACHE_TTL
+)
@@ -0,0 +1,303 @@
+from langchain_mcp_adapters.interceptors import MCPToolCallRequest
+from langchain_mcp_adapters.sessions import Connection, create_session
+from langchain_mcp_adapters.tools import load_mcp_tools
+from langchain_core.tools import BaseTool
+from mcp import ClientSession, McpError, types
+from typing import Callable, Optional
+from dotenv import load_dotenv
+
+import asyncio
+import hashlib
+import httpx
+import json
+import logging
+import os
+import time
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+MCP_TOOLS_TTL = float(os.getenv("MCP_TOOLS_TTL", "300"))
+# Errors of a session the server no longer knows, e.g. after a restart. The
+# server rejected the request without running it. Streamable HTTP reports this
+# as "Session terminated" with code 32600.
+UNKNOWN_SESSION_ERROR_CODES = {32600, types.INVALID_REQUEST}
+# Errors of a session whose server went away. After a closed connection the
+# server may have run the request already.
+BROKEN_SESSION_ERROR_CODES = {types.CONNECTION_CLOSED, *UNKNOWN_SESSION_ERROR_CODES}
+
+
+def catalogue_fingerprint(tools: list[BaseTool]) -> str:
+    return hashlib.sha1(
+        json.dumps(
+            [
+                [tool.name, tool.description, tool.args_schema, tool.metadata]
+                for tool in tools
+            ],
+            sort_keys=True,
+            default=str,
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def is_broken_session(error: McpError) -> bool:
+    return error.error.code in BROKEN_SESSION_ERROR_CODES
+
+
+def is_unknown_session(error: McpError) -> bool:
+    return error.error.code in UNKNOWN_SESSION_ERROR_CODES
+
+
+class McpSessionManager:
+    """Keeps one long-lived session per MCP server and caches their tools.
+
+    The tools are bound to the session they were loaded with, so tool calls
+    skip the session handshake. The tool catalogue of a server is loaded again
+    once it is older than `tools_ttl` seconds, when the server sends a
+    `tools/list_changed` notification, or after its session broke. A session
+    breaks when its connection fails or the server no longer knows it, e.g.
+    after a restart. It is then dropped and the next tool listing or tool call
+    opens a new one. Tool calls always go to the current session, and a call
+    that noticed the break is only retried if the retry cannot run it twice. A
+    reload that finds the same catalogue on the same session keeps the tool
+    objects, otherwise `on_tools_changed` is called, so whatever was built with
+    the old tools can be dropped.
+    """
+
+    def __init__(
+        self,
+        connections: dict[str, Connection],
+        tools_ttl: float = MCP_TOOLS_TTL,
+        on_tools_changed: Optional[Callable[[], None]] = None,
+    ):
+        self.connections = connections
+        self.tools_ttl = tools_ttl
+        self.on_tools_changed = on_tools_changed
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._closed: Optional[asyncio.Event] = None
+        self._sessions: dict[str, ClientSession] = {}
+        self._session_tasks: dict[str, asyncio.Task] = {}
+        self._tools: dict[str, list[BaseTool]] = {}
+        # The session each server's tools are bound to.
+        self._tool_sessions: dict[str, ClientSession] = {}
+        self._expires_at: dict[str, float] = {}
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+
+        # Sessions belong to the event loop they were opened in, so a new loop
+        # (e.g. another asyncio.run) starts with new sessions and tools.
+        if self._tools:
+            self._tools_changed()
+        self._loop = loop
+        self._lock = asyncio.Lock()
+        self._closed = asyncio.Event()
+        self._sessions = {}
+        self._session_tasks = {}
+        self._tools = {}
+        self._tool_sessions = {}
+        self._expires_at = {}
+
+    def _message_handler(self, server_name: str):
+        async def handle_message(message):
+            if isinstance(message, types.ServerNotification) and isinstance(
+                message.root, types.ToolListChangedNotification
+            ):
+                self._expires_at.pop(server_name, None)
+
+        return handle_message
+
+    async def _hold_session(self, server_name: str, ready: asyncio.Future):
+        # The session is opened and closed in this task, as the transports
+        # require, and stays open until the manager is closed.
+        connection = self.connections[server_name]
+        connection = {
+            **connection,
+            "session_kwargs": {
+                **(connection.get("session_kwargs") or {}),
+                "message_handler": self._message_handler(server_name),
+            },
+        }
+        try:
+            async with create_session(connection) as session:  # ty:ignore[invalid-argument-type]
+                await session.initialize()
+                ready.set_result(session)
+                await self._closed.wait()  # ty:ignore[possibly-missing-attribute]
+
+        # The transports run in task groups, which wrap their errors in groups.
+        except (McpError, httpx.HTTPError, OSError, ExceptionGroup) as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"MCP session of '{server_name}' broke: {e!r}")
+
+        finally:
+            if not ready.done():
+                ready.set_exception(
+                    ConnectionError(f"Could not open an MCP session to '{server_name}'")
+                )
+            self._evict(server_name, asyncio.current_task())
+
+    def _evict(self, server_name: str, task: Optional[asyncio.Task]):
+        """Forget the session held by `task`, unless a newer one replaced it."""
+        if task is None or self._session_tasks.get(server_name) is not task:
+            return
+
+        self._session_tasks.pop(server_name, None)
+        self._sessions.pop(server_name, None)
+        self._expires_at.pop(server_name, None)
+        if task is not asyncio.current_task():
+            task.cancel()
+
+    def _evict_session(self, server_name: str, session: ClientSession):
+        if self._sessions.get(server_name) is session:
+            self._evict(server_name, self._session_tasks.get(server_name))
+
+    async def _open_session(self, server_name: str) -> ClientSession:
+        ready = asyncio.get_running_loop().create_future()
+        self._session_tasks[server_name] = asyncio.create_task(
+            self._hold_session(server_name, ready)
+        )
+        session = await ready
+        self._sessions[server_name] = session
+        return session
+
+    async def _reconnect(
+        self, server_name: str, broken: Optional[ClientSession] = None
+    ) -> ClientSession:
+        """Return the current session of a server, replacing `broken` first."""
+        async with self._lock:  # ty:ignore[invalid-context-manager]
+            if broken is not None:
+                self._evict_session(server_name, broken)
+            session = self._sessions.get(server_name)
+            if session is None:
+                session = await self._open_session(server_name)
+            return session
+
+    def _is_replayable(self, server_name: str, tool_name: str) -> bool:
+        for tool in self._tools.get(server_name, []):
+            if tool.name == tool_name:
+                metadata = tool.metadata or {}
+                return bool(
+                    metadata.get("readOnlyHint") or metadata.get("idempotentHint")
+                )
+        return False
+
+    def _call_on_current_session(self, server_name: str, session: ClientSession):
+        """Tool call interceptor that sends calls to the current session.
+
+        The tools stay bound to `session`, so after a reconnect their calls are
+        sent to the new session instead. A call whose session broke is retried
+        once on a new session if the server never ran it, i.e. it did not know
+        the session, or if the tool is read-only or idempotent. Otherwise the
+        call may have run already and the error is raised.
+        """
+
+        async def intercept(request: MCPToolCallRequest, handler):
+            current = self._sessions.get(server_name)
+            if current is None:
+                current = await self._reconnect(server_name)
+
+            try:
+                if current is session:
+                    return await handler(request)
+                return await current.call_tool(request.name, request.args)
+            except McpError as e:
+                if not is_broken_session(e):
+                    raise
+                if not (
+                    is_unknown_session(e)
+                    or self._is_replayable(server_name, request.name)
+                ):
+                    self._evict_session(server_name, current)
+                    raise
+                logger.warning(
+                    f"MCP session of '{server_name}' broke, reconnecting: {e!r}"
+                )
+
+            new_session = await self._reconnect(server_name, current)
+            return await new_session.call_tool(request.name, request.args)
+
+        return intercept
+
+    def _tools_changed(self):
+        if self.on_tools_changed is not None:
+            self.on_tools_changed()
+
+    async def _list_tools(self, server_name: str) -> tuple[ClientSession, list]:
+        session = self._sessions.get(server_name)
+        reused_session = session is not None
+        if session is None:
+            session = await self._open_session(server_name)
+
+        try:
+            return session, await load_mcp_tools(
+                session,
+                server_name=server_name,
+                tool_interceptors=[self._call_on_current_session(server_name, session)],
+            )
+        except McpError as e:
+            if not reused_session or not is_broken_session(e):
+                raise
+            logger.warning(f"MCP session of '{server_name}' broke, reconnecting: {e!r}")
+            self._evict_session(server_name, session)
+            return await self._list_tools(server_name)
+
+    async def _load_tools(self, server_name: str):
+        session, tools = await self._list_tools(server_name)
+        old_tools = self._tools.get(server_name)
+        unchanged = (
+            old_tools is not None
+            and self._tool_sessions.get(server_name) is session
+            and catalogue_fingerprint(old_tools) == catalogue_fingerprint(tools)
+        )
+        if unchanged:
+            tools = old_tools
+        elif old_tools is not None:
+            self._tools_changed()
+
+        self._tools[server_name] = tools
+        self._tool_sessions[server_name] = session
+        self._expires_at[server_name] = time.monotonic() + self.tools_ttl
+
+    async def get_tools(self) -> list[BaseTool]:
+        self._bind_loop()
+        async with self._lock:  # ty:ignore[invalid-context-manager]
+            now = time.monotonic()
+            stale = [
+                server_name
+                for server_name in self.connections
+                if self._expires_at.get(server_name, 0) <= now
+            ]
+            if stale:
+                await asyncio.gather(
+                    *[self._load_tools(server_name) for server_name in stale]
+                )
+
+        return [
+            tool
+            for server_name in self.connections
+            for tool in self._tools.get(server_name, [])
+        ]
+
+    async def aclose(self):
+        if self._closed is None:
+            return
+
+        self._closed.set()
+        await asyncio.gather(*self._session_tasks.values(), return_exceptions=True)
+        self._loop = None
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            server_name: {
+                "connected": server_name in self._sessions,
+                "tools": len(self._tools.get(server_name, [])),
+                "tools_expire_in": max(self._expires_at.get(server_name, now) - now, 0),
+            }
+            for server_name in self.connections
+        }
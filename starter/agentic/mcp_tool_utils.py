@@ -1,3 +1,6 @@
+import json
+
+
 class McpToolFilter:
     def __init__(self, tools: list):
         self.tools = tools
@@ -64,3 +67,23 @@ class McpToolFilter:
 
     def __repr__(self):
         return "\n".join([f"{tool.name} - {tool.description}" for tool in self.tools])
+
+
+def parse_tool_output(output) -> dict | list | None:
+    """Turn the output of an MCP tool call into the JSON value the tool returned.
+
+    Depending on the adapter version the output is a string or a list of
+    content blocks. Tools that returned None yield None.
+    """
+    if isinstance(output, list):
+        output = "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in output
+        )
+    if not output or output == "null":
+        return None
+
+    try:
+        return json.loads(output)
+    except (TypeError, json.JSONDecodeError):
+        return {"message": output}
@@ -0,0 +1,132 @@
+from langchain_core.runnables import RunnableConfig
+from langchain.chat_models import BaseChatModel
+from starter.agentic.agent_cache import compiled_agents
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+from starter.agentic.state import UdaHubState
+from pydantic import BaseModel, Field
+from typing import Optional
+from textwrap import dedent
+
+
+DEFAULT_KEEP_LAST_TURNS = 4
+DEFAULT_CONTEXT_TOKEN_BUDGET = 6000
+DEFAULT_CONTEXT_TOKEN_BUDGETS = {
+    "supervisor": 2000,
+}
+
+
+class RunningSummary(BaseModel):
+    summary: str = Field(
+        description="A summary of the conversation so far, including every fact, decision and open request that later turns may refer to."
+    )
+
+
+def context_token_budget(config: RunnableConfig, node: str) -> int:
+    configurable = config.get("configurable", {})
+    budgets = {
+        **DEFAULT_CONTEXT_TOKEN_BUDGETS,
+        **configurable.get("context_token_budgets", {}),
+    }
+    return budgets.get(
+        node, configurable.get("context_token_budget", DEFAULT_CONTEXT_TOKEN_BUDGET)
+    )
+
+
+def context_messages(
+    state: UdaHubState, config: RunnableConfig, node: str
+) -> list[BaseMessage]:
+    """Return the messages the LLM call of `node` gets to see.
+
+    These are the running summary followed by the newest messages that are not
+    part of it yet, trimmed to the token budget of the node.
+    """
+    summary = state.get("conversation_summary")
+    messages = state.get("messages", [])[state.get("summarized_messages_count") or 0 :]
+
+    context = []
+    if summary:
+        context.append(
+            SystemMessage(f"Summary of the earlier conversation:\n{summary}")
+        )
+
+    budget = context_token_budget(config, node) - count_tokens_approximately(context)
+    recent = trim_messages(
+        messages,
+        max_tokens=max(budget, 0),
+        token_counter=count_tokens_approximately,
+        strategy="last",
+    )
+    # The newest message is always kept, even if it alone exceeds the budget.
+    return context + (recent or messages[-1:])
+
+
+async def update_summary(
+    summary: Optional[str], messages: list[BaseMessage], llm: BaseChatModel
+) -> str:
+    conversation = "\n================================================\n".join(
+        [f"{message.type}: {message.content}" for message in messages]
+    )
+
+    agent = compiled_agents.get(
+        "context_management",
+        None,
+        llm,
+        system_prompt=dedent("""
+        You are a helpful assistant for keeping a running summary of a conversation between a customer and support agents.
+        You get the current summary and the messages that followed it as the user message. Your task is to return an updated summary that covers both.
+        Keep everything that later messages may refer to, e.g. names, IDs, dates, decisions, and requests that are still open.
+        Leave out greetings, small talk and details that are no longer relevant.
+        Do not use more than 200 words for the summary.
+        """),
+        response_format=RunningSummary,
+    )
+
+    response = await agent.ainvoke(
+        {
+            "messages": [
+                HumanMessage(
+                    f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{conversation}"
+                )
+            ]
+        },
+        config={"recursion_limit": 5},
+    )
+    structured_response: RunningSummary = response["structured_response"]
+
+    return structured_response.summary
+
+
+async def context_management_node(
+    state: UdaHubState, config: RunnableConfig
+) -> UdaHubState:
+    configurable = config.get("configurable", {})
+    keep_last_turns = max(
+        configurable.get("context_keep_last_turns", DEFAULT_KEEP_LAST_TURNS), 1
+    )
+    messages = state.get("messages", [])
+    summarized_messages_count = state.get("summarized_messages_count") or 0
+
+    # A turn starts with a user message. Older turns are folded into the summary
+    # only once twice as many turns as are kept have piled up, so the summary
+    # is rewritten every few turns instead of on every turn.
+    turn_starts = [
+        i
+        for i in range(summarized_messages_count, len(messages))
+        if isinstance(messages[i], HumanMessage)
+    ]
+    if len(turn_starts) < 2 * keep_last_turns:
+        return {"messages": []}
+
+    summarize_until = turn_starts[-keep_last_turns]
+    summary = await update_summary(
+        state.get("conversation_summary"),
+        messages[summarized_messages_count:summarize_until],
+        configurable.get("llm"),  # ty:ignore[invalid-argument-type]
+    )
+
+    return {
+        "messages": [],
+        "conversation_summary": summary,
+        "summarized_messages_count": summarize_until,
+    }
@@ -1,7 +1,11 @@
 from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import HumanMessage, AIMessage
 from starter.agentic.state import UdaHubState
-from starter.data.udahub_db import get_messages_for_ticket
+from starter.agentic.chat_interface import aread_message, print_status
+from starter.data.udahub_db import aget_conversation_summary, aget_ticket_messages_page
+
+
+DEFAULT_HISTORY_WINDOW = 20
 
 
 async def enrichment_node(state: UdaHubState, config: RunnableConfig) -> UdaHubState:
@@ -9,24 +13,65 @@ async def enrichment_node(state: UdaHubState, config: RunnableConfig) -> UdaHubS
         return state
 
     ticket_id = config.get("configurable", {}).get("ticket_id", None)
+    history_window = config.get("configurable", {}).get(
+        "history_window", DEFAULT_HISTORY_WINDOW
+    )
     messages = []
     loaded_messages_count = 0
     last_printed_idx = -1
+    conversation_summary = None
+    summarized_messages_count = 0
     if ticket_id:
-        loaded_messages = get_messages_for_ticket(ticket_id)
+        # The running summary covers the messages up to `summarized_until_sequence`.
+        stored_summary = await aget_conversation_summary(ticket_id)
+        conversation_summary = stored_summary["summary"]
+        summarized_until_sequence = stored_summary["summarized_until_sequence"] or 0
+
+        # At least the last `history_window` messages are loaded, and older
+        # pages are read until every message the summary does not cover is in.
+        page = await aget_ticket_messages_page(ticket_id, limit=history_window)
+        loaded_messages = page["messages"]
+        before_sequence = page["before_sequence"]
+        while (
+            before_sequence is not None
+            and before_sequence > summarized_until_sequence + 1
+        ):
+            page = await aget_ticket_messages_page(
+                ticket_id, limit=history_window, before_sequence=before_sequence
+            )
+            loaded_messages = page["messages"] + loaded_messages
+            before_sequence = page["before_sequence"]
 
         ai_messages_count = 0
         for message in loaded_messages:
+            summarized = (message.get("sequence") or 0) <= summarized_until_sequence
             if message.get("role") == "ai" and message.get("content"):
-                messages.append(AIMessage(content=message.get("content")))
+                messages.append(
+                    AIMessage(
+                        content=message.get("content"), id=message.get("message_id")
+                    )
+                )
                 ai_messages_count += 1
+                summarized_messages_count += summarized
 
             if message.get("role") == "user" and message.get("content"):
-                messages.append(HumanMessage(content=f"> {message.get('content')}"))
+                messages.append(
+                    HumanMessage(
+                        content=f"> {message.get('content')}",
+                        id=message.get("message_id"),
+                    )
+                )
+                summarized_messages_count += summarized
 
-        print(
-            f"\nLoaded {len(messages)} messages from long-term memory for ticket_id {ticket_id}\n"
+        print_status(
+            config,
+            f"\nLoaded {len(messages)} messages from long-term memory for ticket_id {ticket_id}\n",
         )
+        # Older messages stay in the LLM's context, but only the last
+        # `history_window` ones are shown to the user again.
+        shown_messages = messages[-history_window:]
+        if before_sequence is not None or len(shown_messages) < len(messages):
+            print_status(config, "(Older messages of this ticket are not shown)\n")
         loaded_messages_count = len(messages)
 
         # Print loaded messages
@@ -35,8 +80,8 @@ async def enrichment_node(state: UdaHubState, config: RunnableConfig) -> UdaHubS
         if not chat_interface:
             raise Exception("No chat interface found")
 
-        for message in messages:
-            chat_interface.read_message(str(message.content))
+        for message in shown_messages:
+            await aread_message(chat_interface, str(message.content))
 
         last_printed_idx = len(messages) - 1
 
@@ -70,4 +115,6 @@ async def enrichment_node(state: UdaHubState, config: RunnableConfig) -> UdaHubS
         "is_enriched": True,
         "loaded_messages_count": loaded_messages_count,
         "last_printed_idx": last_printed_idx,
+        "conversation_summary": conversation_summary,
+        "summarized_messages_count": summarized_messages_count,
     }
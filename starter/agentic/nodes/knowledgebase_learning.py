@@ -1,8 +1,11 @@
 from langchain_core.runnables import RunnableConfig
 from starter.agentic.state import UdaHubState
 from starter.agentic.mcp_tool_utils import McpToolFilter
-from starter.data.udahub_db import create_knowledge_entry
-from langchain.agents import create_agent
+from starter.agentic.chat_interface import print_status
+from starter.agentic.nodes.context_management import context_messages
+from starter.data.udahub_db import acreate_knowledge_entry
+from starter.agentic.agent_cache import compiled_agents
+from langchain_core.messages import HumanMessage
 from pydantic import BaseModel, Field
 from textwrap import dedent
 
@@ -29,7 +32,7 @@ async def knowledgebase_learning_node(
     account_id = user.get("account_id", "")
     llm = config.get("configurable", {}).get("llm")
 
-    messages = state.get("messages", [])
+    messages = context_messages(state, config, "knowledgebase_learning")
     conversation = "\n================================================\n".join(
         [f"{message.type}: {message.content}" for message in messages]
     )
@@ -42,11 +45,13 @@ async def knowledgebase_learning_node(
         .get_all()
     )
 
-    agent = create_agent(
-        model=llm,  # ty:ignore[invalid-argument-type]
-        system_prompt=dedent(f"""
+    agent = compiled_agents.get(
+        "knowledgebase_learning",
+        account_id,
+        llm,  # ty:ignore[invalid-argument-type]
+        system_prompt=dedent("""
         You are a helpful assistant for extracting knowledge from conversations between customers and support agents.
-        Your task is to analyze the conversation and determine if there is any new knowledge that can be extracted and added to the knowledge base.
+        You get the conversation as the user message. Your task is to analyze it and determine if there is any new knowledge that can be extracted and added to the knowledge base.
         The knowledge should be useful for answering future questions from customers and should not be too specific to the current conversation.
 
         Plan:
@@ -63,23 +68,22 @@ async def knowledgebase_learning_node(
         - If you find somehing similar in the knowledge base that either explicitly or implicitly contains the same knowledge, then there is no need to add it again.
         - Do not create knowledge base entries covering products of the customer company as these are likely to change frequently and the knowledge base should contain evergreen content that is not changing too much over time.
         - Be mindful not to spam the knowledge base with redundant or low-quality entries. Only add knowledge that is truly valuable and enhances the overall quality of the knowledge base.
-        
-        Conversation:
-        {conversation}
         """),
         response_format=KnowledgeExtractionResult,
         tools=learning_tools,
     )
-    response = await agent.ainvoke({}, config={"recursion_limit": 10})
+    response = await agent.ainvoke(
+        {"messages": [HumanMessage(conversation)]}, config={"recursion_limit": 10}
+    )
     analysis_result: KnowledgeExtractionResult = response["structured_response"]
 
     if analysis_result.new_knowledge:
-        knowledge_id = create_knowledge_entry(
+        knowledge_id = await acreate_knowledge_entry(
             account_id=account_id,
             title=analysis_result.title,
             content=analysis_result.content,
             tags=analysis_result.tags,
         )
-        print(f"New knowledge entry created with ID: {knowledge_id}")
+        print_status(config, f"New knowledge entry created with ID: {knowledge_id}")
 
     return state
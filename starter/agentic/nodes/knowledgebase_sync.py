@@ -1,23 +1,27 @@
 from langchain_core.runnables import RunnableConfig
 from starter.agentic.state import UdaHubState
 from starter.agentic.mcp_tool_utils import McpToolFilter
+from starter.agentic.chat_interface import print_status
 
 
 async def knowledgebase_sync_node(
     state: UdaHubState, config: RunnableConfig
 ) -> UdaHubState:
     tools = config.get("configurable", {}).get("mcp_tools", [])
+    max_age = config.get("configurable", {}).get("knowledgebase_sync_max_age")
     sync_tools = (
         McpToolFilter(tools)
         .by_author("UDAHub Knowledge Base")
         .by_tags(["sync"])
         .get_all()
     )
-    print("Synchronizing knowledge base...")
+    # The knowledgebase server keeps its collections in sync in the background,
+    # so a sync is only triggered here if the last one is older than max_age.
+    print_status(config, "Synchronizing knowledge base...")
     for tool in sync_tools:
-        print(f"...{tool.name}()")
-        await tool.ainvoke({})
+        print_status(config, f"...{tool.name}()")
+        await tool.ainvoke({"options": {"max_age_seconds": max_age}})
 
-    print("Knowledge base synchronized.\n")
+    print_status(config, "Knowledge base synchronized.\n")
 
     return state
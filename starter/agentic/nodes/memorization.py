@@ -1,9 +1,15 @@
 from langchain_core.runnables import RunnableConfig
 from langchain.chat_models import BaseChatModel
-from langchain.agents import create_agent
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import BaseMessage, HumanMessage
+from starter.agentic.agent_cache import compiled_agents
 from starter.agentic.state import UdaHubState
-from starter.data.udahub_db import create_ticket, add_messages_to_ticket
+from starter.agentic.chat_interface import print_status
+from starter.agentic.nodes.context_management import context_messages
+from starter.data.udahub_db import (
+    acreate_ticket,
+    aadd_messages_to_ticket,
+    asave_conversation_summary,
+)
 from pydantic import BaseModel, Field
 from textwrap import dedent
 
@@ -24,23 +30,24 @@ async def summarize_conversation(
         [f"{message.type}: {message.content}" for message in messages]
     )
 
-    agent = create_agent(
-        model=llm,
-        system_prompt=dedent(f"""
+    agent = compiled_agents.get(
+        "memorize",
+        None,
+        llm,
+        system_prompt=dedent("""
         You are a helpful assistant for summarizing conversations between customers and support agents.
-        You get the full conversation as input and your task is to create a short summary that captures the main topic of the conversation.
+        You get the full conversation as the user message and your task is to create a short summary that captures the main topic of the conversation.
         The summary should be concise and should not contain any details that are not relevant to the main topic.
         The summary should be suitable for the topic of a ticket in a ticketing system, so it should be short and to the point.
         Do not use more than 150 characters for the summary.
         Additionally pick up to five relevant tags that describe the topic of the conversation.
-
-        Conversation:
-        {conversation}
         """),
         response_format=ConversationSummary,
     )
 
-    response = await agent.ainvoke({}, config={"recursion_limit": 5})
+    response = await agent.ainvoke(
+        {"messages": [HumanMessage(conversation)]}, config={"recursion_limit": 5}
+    )
     structured_response: ConversationSummary = response["structured_response"]
 
     return structured_response
@@ -59,9 +66,12 @@ async def memorization_node(state: UdaHubState, config: RunnableConfig) -> UdaHu
 
     messages = state.get("messages", [])
     if not ticket_id:
-        summary = await summarize_conversation(messages, llm)  # ty:ignore[invalid-argument-type]
+        summary = await summarize_conversation(
+            context_messages(state, config, "memorize"),
+            llm,  # ty:ignore[invalid-argument-type]
+        )
 
-        ticket_id = create_ticket(
+        ticket_id = await acreate_ticket(
             account_id=account_id,
             user_id=udahub_user_id,
             channel="chat",
@@ -72,10 +82,23 @@ async def memorization_node(state: UdaHubState, config: RunnableConfig) -> UdaHu
 
     loaded_messages_count = state.get("loaded_messages_count", 0)
     messages_to_store = messages[loaded_messages_count:]
-    add_messages_to_ticket(ticket_id, messages_to_store)  # ty:ignore[invalid-argument-type]
+    await aadd_messages_to_ticket(ticket_id, messages_to_store)  # ty:ignore[invalid-argument-type]
+
+    # The boundary is stored as the sequence of the last summarized message,
+    # since the state does not hold every stored message of the ticket.
+    summarized_messages_count = state.get("summarized_messages_count") or 0
+    summarized_until = (
+        messages[summarized_messages_count - 1] if summarized_messages_count else None
+    )
+    await asave_conversation_summary(
+        ticket_id,
+        state.get("conversation_summary"),
+        summarized_until.id if summarized_until else None,
+    )
 
-    print(
-        f"\nYou can continue this conversation anytime by providing the ticket ID: {ticket_id}\n"
+    print_status(
+        config,
+        f"\nYou can continue this conversation anytime by providing the ticket ID: {ticket_id}\n",
     )
 
     return {
@@ -1,9 +1,10 @@
 from langchain_core.runnables import RunnableConfig
 from starter.agentic.state import UdaHubState
+from starter.agentic.chat_interface import anext_message
 from langchain.messages import HumanMessage
 
 
-def read_message_node(state: UdaHubState, config: RunnableConfig) -> UdaHubState:
+async def read_message_node(state: UdaHubState, config: RunnableConfig) -> UdaHubState:
     chat_interface = config.get("configurable", {}).get("chat_interface")
     terminate_chat = state.get("terminate_chat", False)
 
@@ -11,7 +12,7 @@ def read_message_node(state: UdaHubState, config: RunnableConfig) -> UdaHubState
         raise Exception("No chat interface found")
 
     user_input = []
-    message = chat_interface.next_message()
+    message = await anext_message(chat_interface)
     if not message:
         terminate_chat = True
     else:
@@ -1,9 +1,10 @@
 from langchain_core.runnables import RunnableConfig
 from starter.agentic.state import UdaHubState
+from starter.agentic.chat_interface import aread_message
 from langchain.messages import AIMessage
 
 
-def send_message_node(state: UdaHubState, config: RunnableConfig) -> UdaHubState:
+async def send_message_node(state: UdaHubState, config: RunnableConfig) -> UdaHubState:
     messages = state.get("messages", [])
     last_printed_idx = state.get("last_printed_idx", -1)
     chat_interface = config.get("configurable", {}).get("chat_interface")
@@ -14,7 +15,7 @@ def send_message_node(state: UdaHubState, config: RunnableConfig) -> UdaHubState
     # Send pending messages
     ai_messages: list[AIMessage] = [m for m in messages if isinstance(m, AIMessage)]
     for i in range(last_printed_idx + 1, len(ai_messages)):
-        chat_interface.read_message(str(ai_messages[i].content))
+        await aread_message(chat_interface, str(ai_messages[i].content))
 
     return {
         "messages": [],
@@ -1,6 +1,7 @@
 from langchain_core.runnables import RunnableConfig
 from starter.agentic.state import UdaHubState
-from langchain.agents import create_agent
+from starter.agentic.nodes.context_management import context_messages
+from starter.agentic.agent_cache import compiled_agents
 from langchain_core.messages import SystemMessage
 from pydantic import BaseModel, Field
 from starter.agentic.state import Priority
@@ -41,8 +42,10 @@ async def supervisor_node(state: UdaHubState, config: RunnableConfig) -> UdaHubS
         [f"- {name}: {description}" for name, description in available_agents.items()]
     )
 
-    agent = create_agent(
-        model=llm,  # ty:ignore[invalid-argument-type]
+    agent = compiled_agents.get(
+        "supervisor",
+        account_id,
+        llm,  # ty:ignore[invalid-argument-type]
         system_prompt=SystemMessage(
             dedent(f"""
         You are a supervisor agent inside a helpdesk chatbot for {account_name} (account_id={account_id}):
@@ -65,7 +68,8 @@ async def supervisor_node(state: UdaHubState, config: RunnableConfig) -> UdaHubS
         response_format=SupervisorAnalysis,
     )
     result = await agent.ainvoke(
-        {"messages": state.get("messages", [])}, config={"recursion_limit": 5}
+        {"messages": context_messages(state, config, "supervisor")},
+        config={"recursion_limit": 5},
     )
     response: SupervisorAnalysis = result["structured_response"]
 
@@ -2,14 +2,21 @@ from typing import Optional
 from pydantic import BaseModel, Field
 from langchain.chat_models import BaseChatModel
 from langchain_core.runnables import RunnableConfig
-from langchain.agents import create_agent
+from starter.agentic.agent_cache import AgentContext, compiled_agents
 from langchain.messages import AIMessage, SystemMessage
+from langchain_core.tools import ToolException
 from langgraph.errors import GraphRecursionError
 from starter.agentic.state import UdaHubState, TaskContext
-from starter.agentic.mcp_tool_utils import McpToolFilter
-from starter.data.udahub_db import get_account_by_id
+from starter.agentic.mcp_tool_utils import McpToolFilter, parse_tool_output
+from starter.agentic.identity_cache import identity_cache
+from starter.data.udahub_db import aget_account_by_id
 from textwrap import dedent
 
+import asyncio
+
+
+DEFAULT_VALIDATION_STRATEGY = "deterministic"
+
 
 class UserValidationResult(BaseModel):
     account_id: str = Field(description="The account ID of the UDA Hub customer")
@@ -40,17 +47,20 @@ async def validate_user(
     account_name: str,
     external_user_id: str,
 ) -> UserValidationResult:
-    agent = create_agent(
-        model=llm,
+    agent = compiled_agents.get(
+        "validation",
+        account_id,
+        llm,
         system_prompt=SystemMessage(
             dedent(f"""
             You are a validation agent for UDA Hub. You need to validate a user for the customer '{account_name}' with the account_id='{account_id}'.
             It has already been checked, that '{account_name}' is a legit customer of UDA Hub. 
             You have tools for accessing both UDA Hubs system and the system of the customer. 
 
-            The user with the external user with user_id='{external_user_id}' needs to be validated using the following steps:
+            The user with the user ID in the customers system given below needs to be validated using the following steps:
 
             Check with the customer whether with user exists. If you cannot find a user in the customers system it is an invalid user and you terminate here.
+            If the customer has blocked the user, the validation fails and you terminate here.
             If you find a user check with UDA Hub whether there is a user. If you find one terminate here. If not create a new one.
 
             Rules:
@@ -63,7 +73,11 @@ async def validate_user(
     )
 
     try:
-        result = await agent.ainvoke({}, config={"recursion_limit": 10})
+        result = await agent.ainvoke(
+            {},
+            config={"recursion_limit": 10},
+            context=AgentContext(external_user_id=external_user_id),
+        )
         return result["structured_response"]
 
     except GraphRecursionError:
@@ -73,31 +87,129 @@ async def validate_user(
             uda_hub_user_created=False,
             validation_successfull=False,
             error_message="An internal error occurred.",
-        ).model_dump()
+        )
 
 
-async def validation_node(state: UdaHubState, config: RunnableConfig) -> UdaHubState:
-    # Check if is already validated
-    if state.get("is_validated", False) is True:
-        return state
+def customer_user_tool(tools: list, account_id: str):
+    """Return the read-only customer tool tagged `validation` and `user`.
 
-    tools = config.get("configurable", {}).get("mcp_tools", [])
-    llm = config.get("configurable", {}).get("llm")
-    user = state.get("user", {})
-    account_id = user.get("account_id", "")
-    external_user_id = user.get("external_user_id", "")
+    It is expected to take `{"user": {"user_id": ...}}`.
+    """
+    return (
+        McpToolFilter(tools)
+        .by_author(account_id)
+        .by_read_only(True)
+        .by_tags(["validation", "user"])
+        .get_first()
+    )
 
-    # Check that the provided account id belongs to a customer of UDA HubWW
-    account = get_account_by_id(account_id)
-    if account is None:
-        return {
-            "messages": [AIMessage(content="The provided account ID is invalid.")],
-            "task": TaskContext(status="failed", error="Invalid account ID"),
-            "terminate_chat": True,
-            "has_pending_messages": True,
-        }
 
-    # Validate the provided user
+async def lookup_customer_user(customer_tool, external_user_id: str) -> Optional[dict]:
+    """Return the user as known to the customer, or None if there is none."""
+    customer_user = parse_tool_output(
+        await customer_tool.ainvoke({"user": {"user_id": external_user_id}})
+    )
+    if not isinstance(customer_user, dict) or "error" in customer_user:
+        return None
+    return customer_user
+
+
+def deterministic_validation_tools(tools: list, account_id: str) -> Optional[tuple]:
+    """Return the customer lookup, find and create tools, or None if one is missing.
+
+    Next to the customer tool of `customer_user_tool`, these are UDA Hub's
+    `find_udahub_user` and `create_udahub_user`.
+    """
+    customer_tool = customer_user_tool(tools, account_id)
+    udahub_tools = McpToolFilter(tools).by_author("UDAHub")
+    find_tool = udahub_tools.by_name("find_udahub_user").get_first()
+    create_tool = udahub_tools.by_name("create_udahub_user").get_first()
+    if customer_tool is None or find_tool is None or create_tool is None:
+        return None
+    return customer_tool, find_tool, create_tool
+
+
+async def validate_user_deterministic(
+    tools: list,
+    account_id: str,
+    external_user_id: str,
+) -> UserValidationResult:
+    """Validate a user by calling the validation tools directly, without an LLM."""
+
+    def failed(error_message: str) -> UserValidationResult:
+        return UserValidationResult(
+            account_id=account_id,
+            external_user_id=external_user_id,
+            validation_successfull=False,
+            error_message=error_message,
+        )
+
+    validation_tools = deterministic_validation_tools(tools, account_id)
+    if validation_tools is None:
+        return failed("The tools for a deterministic validation are missing.")
+    customer_tool, find_tool, create_tool = validation_tools
+
+    udahub_user_query = {
+        "user": {"account_id": account_id, "external_user_id": external_user_id}
+    }
+    try:
+        # Both lookups are independent, so they run at the same time.
+        customer_user, udahub_output = await asyncio.gather(
+            lookup_customer_user(customer_tool, external_user_id),
+            find_tool.ainvoke(udahub_user_query),
+        )
+        if customer_user is None:
+            return failed(f"No user {external_user_id} found with '{account_id}'.")
+        if customer_user.get("is_blocked"):
+            return failed(f"User {external_user_id} is blocked by '{account_id}'.")
+
+        full_name = customer_user.get("full_name")
+        udahub_user = parse_tool_output(udahub_output)
+        udahub_user_created = False
+        if not udahub_user:
+            udahub_user = parse_tool_output(
+                await create_tool.ainvoke(
+                    {
+                        "user": {
+                            **udahub_user_query["user"],
+                            "user_name": full_name or external_user_id,
+                        }
+                    }
+                )
+            )
+            udahub_user_created = True
+
+            # A concurrent session may have created the user in the meantime.
+            if not isinstance(udahub_user, dict) or "error" in udahub_user:
+                udahub_user = parse_tool_output(
+                    await find_tool.ainvoke(udahub_user_query)
+                )
+                udahub_user_created = False
+
+    except ToolException as e:
+        return failed(str(e))
+
+    if not isinstance(udahub_user, dict) or "user_id" not in udahub_user:
+        return failed("The UDA Hub user could not be created.")
+
+    return UserValidationResult(
+        account_id=account_id,
+        uda_hub_user_id=udahub_user["user_id"],
+        full_name=full_name,
+        external_user_id=external_user_id,
+        uda_hub_user_created=udahub_user_created,
+        validation_successfull=True,
+    )
+
+
+async def validate_with_tools(
+    tools: list,
+    llm: BaseChatModel,
+    config: RunnableConfig,
+    account: dict,
+    account_id: str,
+    external_user_id: str,
+) -> UserValidationResult:
     validation_tools = []
     validation_tools.extend(
         McpToolFilter(tools).by_author("UDAHub").by_tags(["validation"]).get_all()
@@ -109,26 +221,86 @@ async def validation_node(state: UdaHubState, config: RunnableConfig) -> UdaHubS
         .by_tags(["validation"])
         .get_all()
     )
-    response = await validate_user(
-        llm=llm,  # ty:ignore[invalid-argument-type]
+    # The LLM strategy is meant for customers whose tools do not follow the
+    # contract of the deterministic one, so they fall back to it.
+    strategy = config.get("configurable", {}).get(
+        "validation_strategy", DEFAULT_VALIDATION_STRATEGY
+    )
+    if deterministic_validation_tools(validation_tools, account_id) is None:
+        strategy = "llm"
+    if strategy == "llm":
+        return await validate_user(
+            llm=llm,
+            tools=validation_tools,
+            account_id=account_id,
+            account_name=account.get("account_name", account_id),
+            external_user_id=external_user_id,
+        )
+    return await validate_user_deterministic(
         tools=validation_tools,
         account_id=account_id,
-        account_name=account.get("account_name", account_id),
         external_user_id=external_user_id,
     )
 
-    # In case validation failed let the user know
-    if not response.validation_successfull:
-        return {
-            "messages": [
-                AIMessage(
-                    content=f"I was unable to validate your identity. If this issue persists please reach out to '{account_id}'."
-                )
-            ],
-            "terminate_chat": True,
-            "has_pending_messages": True,
-            "task": TaskContext(status="failed", error=f"{response.error_message}"),
+
+async def validation_node(state: UdaHubState, config: RunnableConfig) -> UdaHubState:
+    # Check if is already validated
+    if state.get("is_validated", False) is True:
+        return state
+
+    tools = config.get("configurable", {}).get("mcp_tools", [])
+    llm = config.get("configurable", {}).get("llm")
+    user = state.get("user", {})
+    account_id = user.get("account_id", "")
+    external_user_id = user.get("external_user_id", "")
+
+    # Check that the provided account id belongs to a customer of UDA HubWW
+    account = identity_cache.get_account(account_id)
+    if account is None:
+        account = await aget_account_by_id(account_id)
+        if account is None:
+            return {
+                "messages": [AIMessage(content="The provided account ID is invalid.")],
+                "task": TaskContext(status="failed", error="Invalid account ID"),
+                "terminate_chat": True,
+                "has_pending_messages": True,
+            }
+        identity_cache.put_account(account_id, account)
+
+    # Users validated by a recent session are not validated again until the
+    # entry expires or UdaHubAgent.invalidate_user drops it.
+    cached_user = identity_cache.get_user(account_id, external_user_id)
+    if cached_user is None:
+        validation_result = await validate_with_tools(
+            tools,
+            llm,  # ty:ignore[invalid-argument-type]
+            config,
+            account,
+            account_id,
+            external_user_id,
+        )
+        if not validation_result.validation_successfull:
+            return {
+                "messages": [
+                    AIMessage(
+                        content=f"I was unable to validate your identity. If this issue persists please reach out to '{account_id}'."
+                    )
+                ],
+                "terminate_chat": True,
+                "has_pending_messages": True,
+                "task": TaskContext(
+                    status="failed", error=f"{validation_result.error_message}"
+                ),
+            }
+
+        cached_user = {
+            "udahub_user_id": f"{validation_result.uda_hub_user_id}",
+            "full_name": f"{validation_result.full_name}",
         }
+        identity_cache.put_user(account_id, external_user_id, cached_user)
+        udahub_user_created = validation_result.uda_hub_user_created
+    else:
+        udahub_user_created = False
 
     return {
         "messages": [],
@@ -139,8 +311,8 @@ async def validation_node(state: UdaHubState, config: RunnableConfig) -> UdaHubS
             "account_name": account.get("account_name"),
             "account_description": account.get("account_description"),
             "external_user_id": external_user_id,
-            "udahub_user_id": f"{response.uda_hub_user_id}",
-            "full_name": f"{response.full_name}",
-            "udahub_user_created": response.uda_hub_user_created,
+            "udahub_user_id": cached_user["udahub_user_id"],
+            "full_name": cached_user["full_name"],
+            "udahub_user_created": udahub_user_created,
         },
     }
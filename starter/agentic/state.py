@@ -33,4 +33,6 @@ class UdaHubState(MessagesState, total=False):
     worker: Optional[str]
     priority: Optional[Priority]
     loaded_messages_count: Optional[int]
+    conversation_summary: Optional[str]
+    summarized_messages_count: Optional[int]
     ticket_for_continuation: Optional[str]
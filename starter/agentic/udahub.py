@@ -1,15 +1,20 @@
-from typing import Optional, TypedDict, Protocol, Awaitable
+from typing import Callable, Literal, Optional, TypedDict, Protocol, Awaitable
 from langgraph.graph import START, END, StateGraph
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langchain_mcp_adapters.client import MultiServerMCPClient, StreamableHttpConnection
 from langchain_mcp_adapters.sessions import Connection
 from langchain_core.runnables import RunnableConfig
 from langchain_core.runnables.graph import MermaidDrawMethod
 from starter.agentic.state import UdaHubState, UserContext
+from starter.agentic.identity_cache import identity_cache
+from starter.agentic.agent_cache import compiled_agents
+from starter.agentic.mcp_sessions import MCP_TOOLS_TTL, McpSessionManager
+from starter.agentic.checkpointer import BoundedSqliteSaver
 from starter.agentic.nodes.knowledgebase_sync import knowledgebase_sync_node
 from starter.agentic.nodes.knowledgebase_learning import knowledgebase_learning_node
 from starter.agentic.nodes.validation import validation_node
 from starter.agentic.nodes.enrichment import enrichment_node
+from starter.agentic.nodes.context_management import context_management_node
 from starter.agentic.nodes.supervisor import supervisor_node
 from starter.agentic.nodes.memorization import memorization_node
 from starter.agentic.nodes.send_messages import send_message_node
@@ -19,7 +24,11 @@ from starter.agentic.agents.escalate_to_human import escalate_to_human_agent_nod
 from starter.agentic.agents.faq import faq_agent_node
 from starter.agentic.agents.reservation import reservation_agent_node
 from starter.agentic.agents.subscription import subscription_agent_node
-from starter.agentic.chat_interface import ChatInterface, ConsoleChatInterface
+from starter.agentic.chat_interface import (
+    AsyncChatInterface,
+    AsyncConsoleChatInterface,
+    ChatInterface,
+)
 from langchain_openai import ChatOpenAI
 from IPython.display import Image
 from dotenv import load_dotenv
@@ -43,6 +52,15 @@ class McpServerList:
     def create_client(self) -> MultiServerMCPClient:
         return MultiServerMCPClient(self.servers)
 
+    def create_session_manager(
+        self,
+        tools_ttl: float = MCP_TOOLS_TTL,
+        on_tools_changed: Optional[Callable[[], None]] = None,
+    ) -> McpSessionManager:
+        return McpSessionManager(
+            self.servers, tools_ttl=tools_ttl, on_tools_changed=on_tools_changed
+        )
+
 
 class AgentAction(Protocol):
     def __call__(
@@ -101,10 +119,27 @@ class UdaHubAgent:
         mcp_servers: McpServerList = McpServerList(),
         agents: list[UdaHubAgent] = DEFAULT_AGENT_SET,
         openai_model: str = "gpt-4.1",
+        # Three times the server's default KNOWLEDGE_BASE_SYNC_INTERVAL, so
+        # only a stalled background sync triggers one on the request path.
+        knowledgebase_sync_max_age: Optional[int] = 900,
+        history_window: int = 20,
+        context_keep_last_turns: int = 4,
+        context_token_budgets: Optional[dict[str, int]] = None,
+        validation_strategy: Literal["deterministic", "llm"] = "deterministic",
+        mcp_tools_ttl: float = MCP_TOOLS_TTL,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
     ):
         self.agents = agents
+        self.knowledgebase_sync_max_age = knowledgebase_sync_max_age
+        self.history_window = history_window
+        self.context_keep_last_turns = context_keep_last_turns
+        self.context_token_budgets = context_token_budgets or {}
+        self.validation_strategy = validation_strategy
+        # Only a checkpointer built here is closed again by `aclose()`.
+        self._owns_checkpointer = checkpointer is None
+        self.checkpointer = checkpointer or self._build_checkpointer()
         self.graph = self._build_graph()
-        self.mcp_client = self._build_mcp_client(mcp_servers)
+        self.mcp_sessions = self._build_mcp_sessions(mcp_servers, mcp_tools_ttl)
         self.llm = ChatOpenAI(
             model=openai_model,  # ty:ignore[unknown-argument]
             temperature=0.0,
@@ -117,6 +152,7 @@ class UdaHubAgent:
         graph.add_node(node="knowledgebase_sync", action=knowledgebase_sync_node)
         graph.add_node(node="validation", action=validation_node)
         graph.add_node(node="enrichment", action=enrichment_node)
+        graph.add_node(node="context_management", action=context_management_node)
         graph.add_node(node="supervisor", action=supervisor_node)
         graph.add_node(node="escalate_to_human", action=escalate_to_human_agent_node)
 
@@ -134,7 +170,8 @@ class UdaHubAgent:
         graph.add_edge(START, "knowledgebase_sync")
         graph.add_edge("knowledgebase_sync", "validation")
         graph.add_edge("validation", "enrichment")
-        graph.add_edge("enrichment", "supervisor")
+        graph.add_edge("enrichment", "context_management")
+        graph.add_edge("context_management", "supervisor")
 
         supervisor_path_map = {agent["name"]: agent["name"] for agent in self.agents}
         supervisor_path_map["escalate_to_human"] = "escalate_to_human"
@@ -150,19 +187,23 @@ class UdaHubAgent:
         for agent in self.agents:
             graph.add_edge(agent["name"], "supervisor")
 
-        graph.add_edge("read_message", "supervisor")
+        graph.add_edge("read_message", "context_management")
         graph.add_edge("send_message", "supervisor")
         graph.add_edge("escalate_to_human", "supervisor")
         graph.add_edge("memorize", "knowledgebase_learning")
         graph.add_edge("knowledgebase_learning", END)
 
-        checkpointer = MemorySaver()
-        return graph.compile(checkpointer=checkpointer)
+        return graph.compile(checkpointer=self.checkpointer)
+
+    def _build_checkpointer(self) -> BaseCheckpointSaver:
+        checkpointer = BoundedSqliteSaver.from_path()
+        checkpointer.start_compaction()
+        return checkpointer
 
     def _supervisor_handoff(self, state: UdaHubState) -> str:
         return state.get("worker") or "escalate_to_human"
 
-    def _build_mcp_client(self, mcp_servers: McpServerList):
+    def _build_mcp_sessions(self, mcp_servers: McpServerList, tools_ttl: float):
         return (
             mcp_servers.add_connection(
                 "udahub",
@@ -176,9 +217,18 @@ class UdaHubAgent:
                     url="http://localhost:8002/mcp", transport="streamable_http"
                 ),
             )
-            .create_client()
+            # Compiled agents hold on to the tools they were built with.
+            .create_session_manager(tools_ttl, on_tools_changed=compiled_agents.clear)
         )
 
+    def invalidate_user(self, account_id: str, external_user_id: str):
+        """Validate the user again on the next chat, e.g. after they were blocked."""
+        identity_cache.invalidate_user(account_id, external_user_id)
+
+    def invalidate_account(self, account_id: str):
+        """Reload the account and validate all of its users again on the next chat."""
+        identity_cache.invalidate_account(account_id)
+
     def draw_graph_as_mermaid(self) -> Image:
         return Image(
             self.graph.get_graph().draw_mermaid_png(
@@ -195,11 +245,17 @@ class UdaHubAgent:
         external_user_id: str,
         ticket_id: Optional[str] = None,
         thread_id: str = str(uuid.uuid4()),
-        chat_interface: ChatInterface = ConsoleChatInterface(),
+        chat_interface: ChatInterface
+        | AsyncChatInterface = AsyncConsoleChatInterface(),
+        quiet: bool = False,
     ):
-        print("(You can quit the chat by sending an empty message)\n")
-        tools = await self.mcp_client.get_tools()
-        print("\nStarting UDA Hub chat...")
+        # Quiet chats, e.g. the sessions of the chat gateway, are not held on
+        # the console, so the graph logs its status lines instead.
+        if not quiet:
+            print("(You can quit the chat by sending an empty message)\n")
+        tools = await self.mcp_sessions.get_tools()
+        if not quiet:
+            print("\nStarting UDA Hub chat...")
 
         state = UdaHubState(
             messages=[],
@@ -221,11 +277,18 @@ class UdaHubAgent:
                 "chat_interface": chat_interface,
                 "available_agents": available_agents,
                 "ticket_id": ticket_id,
+                "knowledgebase_sync_max_age": self.knowledgebase_sync_max_age,
+                "history_window": self.history_window,
+                "context_keep_last_turns": self.context_keep_last_turns,
+                "context_token_budgets": self.context_token_budgets,
+                "validation_strategy": self.validation_strategy,
+                "quiet": quiet,
             },
             "recursion_limit": 100,
         }
 
-        print(f"Thread ID: {thread_id}\n")
+        if not quiet:
+            print(f"Thread ID: {thread_id}\n")
         state = await self.graph.ainvoke(state, config=config)
 
         return ChatContinuationInfo(
@@ -233,6 +296,14 @@ class UdaHubAgent:
             ticket_id=state.get("ticket_for_continuation"),
         )
 
+    async def aclose(self):
+        """Close the MCP sessions kept open for the chats and the checkpointer."""
+        await self.mcp_sessions.aclose()
+        if self._owns_checkpointer and isinstance(
+            self.checkpointer, BoundedSqliteSaver
+        ):
+            await asyncio.to_thread(self.checkpointer.close)
+
 
 if __name__ == "__main__":
     mcp_servers = McpServerList().add_connection(
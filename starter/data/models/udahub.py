@@ -6,6 +6,8 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
+    Integer,
     UniqueConstraint,
 )
 from sqlalchemy.ext.declarative import declarative_base
@@ -63,6 +65,8 @@ class Ticket(Base):
     user_id = Column(String, ForeignKey("users.user_id"), nullable=False)
     channel = Column(String)
     summary = Column(String)
+    conversation_summary = Column(Text)
+    summarized_until_sequence = Column(Integer)
     created_at = Column(DateTime, default=func.now())
 
     account = relationship("Account", back_populates="tickets")
@@ -72,6 +76,8 @@ class Ticket(Base):
     )
     messages = relationship("TicketMessage", back_populates="ticket")
 
+    __table_args__ = (Index("ix_tickets_user_id", "user_id"),)
+
     def __repr__(self):
         return f"<Ticket(ticket_id='{self.ticket_id}', channel='{self.channel}', created_at='{self.created_at}')>"
 
@@ -104,10 +110,21 @@ class TicketMessage(Base):
     ticket_id = Column(String, ForeignKey("tickets.ticket_id"), nullable=False)
     role = Column(Enum(RoleEnum, name="role_enum"), nullable=False)
     content = Column(Text)
+    # Position of the message within its ticket, assigned when it is stored.
+    sequence = Column(Integer)
     created_at = Column(DateTime, default=func.now())
 
     ticket = relationship("Ticket", back_populates="messages")
 
+    __table_args__ = (
+        Index(
+            "ix_ticket_messages_ticket_id_sequence",
+            "ticket_id",
+            "sequence",
+            unique=True,
+        ),
+    )
+
     def __repr__(self):
         short_content = (
             (self.content[:30] + "...")
@@ -129,5 +146,7 @@ class Knowledge(Base):
 
     account = relationship("Account", back_populates="knowledge_articles")
 
+    __table_args__ = (Index("ix_knowledge_account_id", "account_id"),)
+
     def __repr__(self):
         return f"<Knowledge(article_id='{self.article_id}', title='{self.title}')>"
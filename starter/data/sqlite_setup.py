@@ -0,0 +1,127 @@
+from sqlalchemy import Engine, event
+from concurrent.futures import Future
+from dotenv import load_dotenv
+from typing import Any, Callable, Optional
+
+import asyncio
+import functools
+import os
+import queue
+import threading
+
+
+load_dotenv()
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_WRITE_QUEUE_SIZE = int(os.getenv("SQLITE_WRITE_QUEUE_SIZE", "1024"))
+
+# WAL lets readers run while a write is in progress, and synchronous=NORMAL
+# only syncs at checkpoints, which is still safe against corruption in WAL mode.
+SQLITE_PRAGMAS = {
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "mmap_size": SQLITE_MMAP_SIZE,
+    # A negative cache size is a size in KiB instead of a number of pages.
+    "cache_size": -SQLITE_CACHE_SIZE_KB,
+    "temp_store": "MEMORY",
+}
+
+
+def set_sqlite_pragmas(engine: Engine, pragmas: Optional[dict] = None):
+    """Run the given PRAGMA statements on every new connection of the engine."""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+class SerialWriter:
+    """Runs the write transactions of one database on a dedicated thread.
+
+    SQLite allows a single writer at a time. Queueing the writes instead of
+    letting threads race for the write lock keeps them from stalling on
+    "database is locked", while readers keep running in parallel under WAL.
+    """
+
+    def __init__(self, name: str, max_pending: int = SQLITE_WRITE_QUEUE_SIZE):
+        self.name = name
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._work, name=f"{self.name}-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _work(self):
+        while True:
+            future, fn, args, kwargs = self._queue.get()
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+            self._queue.task_done()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue `fn` to run on the writer thread. Blocks while the queue is full."""
+        self._start()
+        future: Future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn` on the writer thread and wait for its result."""
+        # Writes issued by a queued write run inline, waiting would deadlock.
+        if threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def arun(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn` on the writer thread without blocking the event loop.
+
+        While the queue is full, the write waits for a free slot on a worker
+        thread, so the event loop keeps serving other tasks.
+        """
+        self._start()
+        future: Future = Future()
+        item = (future, fn, args, kwargs)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, item)
+        return await asyncio.wrap_future(future)
+
+    def serialized(self, fn: Callable) -> Callable:
+        """Decorate `fn` so every call of it runs on the writer thread."""
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return self.run(fn, *args, **kwargs)
+
+        return wrapper
+
+    def aserialized(self, fn: Callable) -> Callable:
+        """Like `serialized`, but without blocking the event loop while waiting."""
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await self.arun(fn, *args, **kwargs)
+
+        return wrapper
+
+    def pending(self) -> int:
+        return self._queue.qsize()
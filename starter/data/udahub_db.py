@@ -1,5 +1,5 @@
-from sqlalchemy import select, create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy import Engine, func, select, create_engine
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.dialects.sqlite import insert
 from starter.data.models.udahub import (
     User,
@@ -9,22 +9,83 @@ from starter.data.models.udahub import (
     TicketMessage,
     Knowledge,
 )
+from starter.data.sqlite_setup import SerialWriter, set_sqlite_pragmas
+from starter.data.udahub_migrations import migrate
 from dotenv import load_dotenv
 from langchain_core.messages import BaseMessage
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable, Optional
 
+import asyncio
+import functools
 import os
+import threading
 import uuid
 
 
 load_dotenv()
 
 UDAHUB_DB_PATH = Path(os.getenv("UDAHUB_DB_PATH", "./data/core/udahub.db")).resolve()
+UDAHUB_DB_POOL_SIZE = int(os.getenv("UDAHUB_DB_POOL_SIZE", "5"))
+UDAHUB_DB_MAX_OVERFLOW = int(os.getenv("UDAHUB_DB_MAX_OVERFLOW", "10"))
+UDAHUB_DB_POOL_TIMEOUT = float(os.getenv("UDAHUB_DB_POOL_TIMEOUT", "30"))
+UDAHUB_DB_READ_THREADS = int(os.getenv("UDAHUB_DB_READ_THREADS", "8"))
+# Keeps the IN lists that count existing messages below SQLite's limit of
+# bound variables per statement.
+MESSAGE_LOOKUP_CHUNK_SIZE = 500
+
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_engine_lock = threading.Lock()
+# Every write goes through this queue, so concurrent chats never race for the
+# SQLite write lock. Reads use the pool and run in parallel under WAL.
+udahub_writer = SerialWriter("udahub")
+# Runs the reads of the async API, so they never block the event loop.
+udahub_readers = ThreadPoolExecutor(
+    max_workers=UDAHUB_DB_READ_THREADS, thread_name_prefix="udahub-reader"
+)
 
 
+def get_engine() -> Engine:
+    """Return the engine shared by all helpers, building it on first use."""
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(
+                    f"sqlite:///{UDAHUB_DB_PATH}",
+                    pool_size=UDAHUB_DB_POOL_SIZE,
+                    max_overflow=UDAHUB_DB_MAX_OVERFLOW,
+                    pool_timeout=UDAHUB_DB_POOL_TIMEOUT,
+                )
+                set_sqlite_pragmas(engine)
+                # Upgrade databases created by older versions in place.
+                migrate(engine)
+                _session_factory = sessionmaker(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def open_session() -> Session:
+    """Open a session on a pooled connection of the shared engine."""
+    get_engine()
+    return _session_factory()
+
+
+def dispose_engine():
+    """Close all pooled connections, e.g. after forking the process."""
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+
+
+@udahub_writer.serialized
 def create_user(account_id: str, external_user_id: str, user_name: str) -> dict:
-    engine = create_engine(f"sqlite:///{UDAHUB_DB_PATH}")
-    with Session(engine) as session:
+    with open_session() as session:
         new_user = User(
             user_id=str(uuid.uuid4()),
             account_id=account_id,
@@ -45,8 +106,7 @@ def create_user(account_id: str, external_user_id: str, user_name: str) -> dict:
 
 
 def get_user_by_id(user_id: str) -> dict | None:
-    engine = create_engine(f"sqlite:///{UDAHUB_DB_PATH}")
-    with Session(engine) as session:
+    with open_session() as session:
         statement = select(User).where(User.user_id == user_id)
         result = session.execute(statement).scalar_one_or_none()
         if result is None:
@@ -66,8 +126,7 @@ def get_user_by_id(user_id: str) -> dict | None:
 def get_user_by_account_and_external_id(
     account_id: str, external_user_id: str
 ) -> dict | None:
-    engine = create_engine(f"sqlite:///{UDAHUB_DB_PATH}")
-    with Session(engine) as session:
+    with open_session() as session:
         statement = select(User).where(
             User.account_id == account_id,
             User.external_user_id == external_user_id,
@@ -88,8 +147,7 @@ def get_user_by_account_and_external_id(
 
 
 def get_account_by_id(account_id: str) -> dict | None:
-    engine = create_engine(f"sqlite:///{UDAHUB_DB_PATH}")
-    with Session(engine) as session:
+    with open_session() as session:
         statement = select(Account).where(Account.account_id == account_id)
         result = session.execute(statement).scalar_one_or_none()
         if result is None:
@@ -105,6 +163,7 @@ def get_account_by_id(account_id: str) -> dict | None:
         return result
 
 
+@udahub_writer.serialized
 def create_ticket(
     account_id: str,
     user_id: str,
@@ -113,8 +172,7 @@ def create_ticket(
     status: str,
     tags: list[str],
 ) -> str:
-    engine = create_engine(f"sqlite:///{UDAHUB_DB_PATH}")
-    with Session(engine) as session:
+    with open_session() as session:
         ticket_id = str(uuid.uuid4())
         new_ticket = Ticket(
             ticket_id=ticket_id,
@@ -162,65 +220,180 @@ def create_ticket(
 #         session.commit()
 
 
-def add_messages_to_ticket(ticket_id: str, messages: list[BaseMessage]):
-    engine = create_engine(f"sqlite:///{UDAHUB_DB_PATH}")
-    with Session(engine) as session:
-        for message in messages:
-            stmt = insert(TicketMessage).values(
-                message_id=message.id,
-                ticket_id=ticket_id,
-                role="user" if message.type == "human" else "ai",
-                content=message.content,
+def message_role(message: BaseMessage) -> str:
+    return "user" if message.type == "human" else "ai"
+
+
+@udahub_writer.serialized
+def add_messages_to_ticket(ticket_id: str, messages: list[BaseMessage]) -> dict:
+    """Upsert the messages of a ticket with a single executemany statement.
+
+    Returns how many messages were inserted and how many already existed and
+    were updated.
+    """
+    # Later versions of a message replace earlier ones within the same call.
+    # Messages without an id are distinct messages and get one of their own.
+    rows = {
+        message.id or str(uuid.uuid4()): {
+            "ticket_id": ticket_id,
+            "role": message_role(message),
+            "content": message.content,
+        }
+        for message in messages
+    }
+    rows = [{"message_id": message_id, **row} for message_id, row in rows.items()]
+    if not rows:
+        return {"inserted": 0, "updated": 0}
+
+    # The sequence is only set on insert, updated messages keep their position.
+    stmt = insert(TicketMessage)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["message_id"],
+        set_={"content": stmt.excluded.content, "role": stmt.excluded.role},
+    )
+
+    with open_session() as session:
+        message_ids = [row["message_id"] for row in rows]
+        existing_ids = set()
+        for i in range(0, len(message_ids), MESSAGE_LOOKUP_CHUNK_SIZE):
+            existing_ids.update(
+                session.execute(
+                    select(TicketMessage.message_id).where(
+                        TicketMessage.message_id.in_(
+                            message_ids[i : i + MESSAGE_LOOKUP_CHUNK_SIZE]
+                        )
+                    )
+                ).scalars()
             )
 
-            stmt = stmt.on_conflict_do_update(
-                index_elements=["message_id"],
-                set_={
-                    "content": message.content,
-                    "role": "user" if message.type == "human" else "ai",
-                },
+        # Runs on the writer thread, so no other call can take the same numbers.
+        next_sequence = session.execute(
+            select(func.coalesce(func.max(TicketMessage.sequence), 0)).where(
+                TicketMessage.ticket_id == ticket_id
             )
+        ).scalar_one()
+        for row in rows:
+            if row["message_id"] in existing_ids:
+                row["sequence"] = None
+            else:
+                next_sequence += 1
+                row["sequence"] = next_sequence
+
+        session.execute(stmt, rows)
+        session.commit()
 
-            session.execute(stmt)
+    return {"inserted": len(rows) - len(existing_ids), "updated": len(existing_ids)}
+
+
+def message_to_dict(message: TicketMessage) -> dict:
+    return {
+        "message_id": message.message_id,
+        "ticket_id": message.ticket_id,
+        "role": message.role.value,
+        "content": message.content,
+        "sequence": message.sequence,
+        "created_at": message.created_at.isoformat(),
+    }
 
-        session.commit()
+
+def ensure_ticket_exists(session: Session, ticket_id: str):
+    ticket = session.execute(
+        select(Ticket.ticket_id).where(Ticket.ticket_id == ticket_id)
+    ).scalar_one_or_none()
+    if ticket is None:
+        raise ValueError(f"Ticket with ID {ticket_id} does not exist.")
 
 
 def get_messages_for_ticket(ticket_id: str) -> list[dict]:
-    engine = create_engine(f"sqlite:///{UDAHUB_DB_PATH}")
-    with Session(engine) as session:
-        ticket = session.execute(
-            select(Ticket).where(Ticket.ticket_id == ticket_id)
-        ).scalar_one_or_none()
-        if ticket is None:
-            raise ValueError(f"Ticket with ID {ticket_id} does not exist.")
+    with open_session() as session:
+        ensure_ticket_exists(session, ticket_id)
 
         messages = (
             session.execute(
                 select(TicketMessage)
                 .where(TicketMessage.ticket_id == ticket_id)
-                .order_by(TicketMessage.created_at.asc())
+                .order_by(TicketMessage.sequence.asc(), TicketMessage.created_at.asc())
             )
             .scalars()
             .all()
         )
 
-        result = [
-            {
-                "message_id": message.message_id,
-                "ticket_id": message.ticket_id,
-                "role": message.role.value,
-                "content": message.content,
-                "created_at": message.created_at.isoformat(),
-            }
-            for message in messages
-        ]
-        return result
+        return [message_to_dict(message) for message in messages]
+
+
+def get_ticket_messages_page(
+    ticket_id: str, limit: int = 20, before_sequence: Optional[int] = None
+) -> dict:
+    """Return the newest `limit` messages of a ticket before `before_sequence`.
+
+    Pages are found with a keyset on the per-ticket sequence, so reading a
+    page costs the same no matter how long the ticket is. The messages of a
+    page are in chronological order. The returned `before_sequence` reads the
+    next older page and is None once the oldest message was returned.
+    """
+    with open_session() as session:
+        ensure_ticket_exists(session, ticket_id)
+
+        statement = (
+            select(TicketMessage)
+            .where(TicketMessage.ticket_id == ticket_id)
+            .order_by(TicketMessage.sequence.desc())
+            .limit(limit + 1)
+        )
+        if before_sequence is not None:
+            statement = statement.where(TicketMessage.sequence < before_sequence)
+        messages = session.execute(statement).scalars().all()
+
+        page = [message_to_dict(message) for message in reversed(messages[:limit])]
+        has_older = len(messages) > limit
+        return {
+            "messages": page,
+            "before_sequence": page[0]["sequence"] if has_older and page else None,
+        }
+
+
+@udahub_writer.serialized
+def save_conversation_summary(
+    ticket_id: str, summary: Optional[str], summarized_until_message_id: Optional[str]
+):
+    """Persist the running summary of a ticket.
+
+    The summary covers the stored messages of the ticket up to and including
+    the message `summarized_until_message_id`.
+    """
+    with open_session() as session:
+        ticket = session.get(Ticket, ticket_id)
+        if ticket is None:
+            raise ValueError(f"Ticket with ID {ticket_id} does not exist.")
+
+        summarized_until_sequence = None
+        if summarized_until_message_id is not None:
+            summarized_until_sequence = session.execute(
+                select(TicketMessage.sequence).where(
+                    TicketMessage.ticket_id == ticket_id,
+                    TicketMessage.message_id == summarized_until_message_id,
+                )
+            ).scalar_one_or_none()
+        ticket.conversation_summary = summary
+        ticket.summarized_until_sequence = summarized_until_sequence or 0
+        session.commit()
 
 
+def get_conversation_summary(ticket_id: str) -> dict:
+    with open_session() as session:
+        ticket = session.get(Ticket, ticket_id)
+        if ticket is None:
+            raise ValueError(f"Ticket with ID {ticket_id} does not exist.")
+
+        return {
+            "summary": ticket.conversation_summary,
+            "summarized_until_sequence": ticket.summarized_until_sequence,
+        }
+
+
+@udahub_writer.serialized
 def create_knowledge_entry(account_id: str, title: str, content: str, tags: str) -> str:
-    engine = create_engine(f"sqlite:///{UDAHUB_DB_PATH}")
-    with Session(engine) as session:
+    with open_session() as session:
         article_id = str(uuid.uuid4())
         new_knowledge = Knowledge(
             account_id=account_id,
@@ -233,3 +406,83 @@ def create_knowledge_entry(account_id: str, title: str, content: str, tags: str)
         session.commit()
 
         return article_id
+
+
+# Async API for the graph nodes. Reads run on the reader threads and writes on
+# the writer thread, while the event loop keeps serving other chats.
+
+
+async def run_read(fn: Callable, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        udahub_readers, functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def acreate_user(account_id: str, external_user_id: str, user_name: str) -> dict:
+    return await udahub_writer.arun(
+        create_user, account_id, external_user_id, user_name
+    )
+
+
+async def aget_user_by_id(user_id: str) -> dict | None:
+    return await run_read(get_user_by_id, user_id)
+
+
+async def aget_user_by_account_and_external_id(
+    account_id: str, external_user_id: str
+) -> dict | None:
+    return await run_read(
+        get_user_by_account_and_external_id, account_id, external_user_id
+    )
+
+
+async def aget_account_by_id(account_id: str) -> dict | None:
+    return await run_read(get_account_by_id, account_id)
+
+
+async def acreate_ticket(
+    account_id: str,
+    user_id: str,
+    channel: str,
+    summary: str,
+    status: str,
+    tags: list[str],
+) -> str:
+    return await udahub_writer.arun(
+        create_ticket, account_id, user_id, channel, summary, status, tags
+    )
+
+
+async def aadd_messages_to_ticket(ticket_id: str, messages: list[BaseMessage]) -> dict:
+    return await udahub_writer.arun(add_messages_to_ticket, ticket_id, messages)
+
+
+async def aget_messages_for_ticket(ticket_id: str) -> list[dict]:
+    return await run_read(get_messages_for_ticket, ticket_id)
+
+
+async def aget_ticket_messages_page(
+    ticket_id: str, limit: int = 20, before_sequence: Optional[int] = None
+) -> dict:
+    return await run_read(get_ticket_messages_page, ticket_id, limit, before_sequence)
+
+
+async def asave_conversation_summary(
+    ticket_id: str, summary: Optional[str], summarized_until_message_id: Optional[str]
+):
+    return await udahub_writer.arun(
+        save_conversation_summary, ticket_id, summary, summarized_until_message_id
+    )
+
+
+async def aget_conversation_summary(ticket_id: str) -> dict:
+    return await run_read(get_conversation_summary, ticket_id)
+
+
+async def acreate_knowledge_entry(
+    account_id: str, title: str, content: str, tags: str
+) -> str:
+    return await udahub_writer.arun(
+        create_knowledge_entry, account_id, title, content, tags
+    )
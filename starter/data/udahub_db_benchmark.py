@@ -0,0 +1,76 @@
+"""Microbenchmark of the per-call overhead of the UdaHub DB helpers.
+
+Compares building an engine per call, as the helpers used to do, with the
+pooled engine that is shared by all helpers now.
+
+    python -m starter.data.udahub_db_benchmark --iterations 500 --threads 8
+"""
+
+from sqlalchemy import select, create_engine
+from sqlalchemy.orm import Session
+from starter.data.models.udahub import Account
+from starter.data.udahub_db import UDAHUB_DB_PATH, get_account_by_id
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import argparse
+import statistics
+import time
+
+
+def engine_per_call(account_id: str):
+    engine = create_engine(f"sqlite:///{UDAHUB_DB_PATH}")
+    with Session(engine) as session:
+        statement = select(Account).where(Account.account_id == account_id)
+        session.execute(statement).scalar_one_or_none()
+
+
+def pooled_engine(account_id: str):
+    get_account_by_id(account_id)
+
+
+def measure(
+    call: Callable[[str], None], account_id: str, iterations: int, threads: int
+) -> dict:
+    def timed_call(_) -> float:
+        started_at = time.perf_counter()
+        call(account_id)
+        return time.perf_counter() - started_at
+
+    call(account_id)  # warm up imports, the pool and the page cache
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        durations = list(executor.map(timed_call, range(iterations)))
+    elapsed = time.perf_counter() - started_at
+
+    return {
+        "mean_ms": statistics.mean(durations) * 1000,
+        "p95_ms": statistics.quantiles(durations, n=20)[-1] * 1000,
+        "calls_per_second": iterations / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--account-id", default="cultpass")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"Database: {UDAHUB_DB_PATH}")
+    print(f"{args.iterations} calls on {args.threads} thread(s)\n")
+    print(f"{'variant':<18}{'mean ms':>10}{'p95 ms':>10}{'calls/s':>12}")
+    for name, call in [
+        ("engine per call", engine_per_call),
+        ("pooled engine", pooled_engine),
+    ]:
+        result = measure(call, args.account_id, args.iterations, args.threads)
+        print(
+            f"{name:<18}{result['mean_ms']:>10.3f}{result['p95_ms']:>10.3f}"
+            f"{result['calls_per_second']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
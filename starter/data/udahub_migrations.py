@@ -0,0 +1,207 @@
+"""Versioned schema migrations for the UdaHub database.
+
+The schema version of a database file is kept in SQLite's `user_version`.
+Pending migrations are applied in order, each in its own transaction, so
+existing `udahub.db` files are upgraded in place.
+
+    python -m starter.data.udahub_migrations [--db starter/data/core/udahub.db] [--check]
+"""
+
+from sqlalchemy import Connection, Engine, create_engine, text
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import argparse
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+@dataclass(frozen=True)
+class QueryPlanCheck:
+    name: str
+    sql: str
+    parameters: dict
+    expected_index: str
+
+
+def add_secondary_indexes(connection: Connection):
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_knowledge_account_id ON knowledge (account_id)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_tickets_user_id ON tickets (user_id)"
+    )
+
+
+def add_message_sequence(connection: Connection):
+    columns = [
+        row[1]
+        for row in connection.exec_driver_sql("PRAGMA table_info(ticket_messages)")
+    ]
+    if "sequence" not in columns:
+        connection.exec_driver_sql(
+            "ALTER TABLE ticket_messages ADD COLUMN sequence INTEGER"
+        )
+
+    # Number the messages without a sequence per ticket in their stored order,
+    # after the messages that already have one.
+    connection.exec_driver_sql(
+        """
+        UPDATE ticket_messages SET sequence = numbered.sequence
+        FROM (
+            SELECT
+                m.rowid AS message_rowid,
+                ROW_NUMBER() OVER (
+                    PARTITION BY m.ticket_id ORDER BY m.created_at, m.rowid
+                ) + COALESCE(
+                    (
+                        SELECT MAX(s.sequence) FROM ticket_messages s
+                        WHERE s.ticket_id = m.ticket_id
+                    ),
+                    0
+                ) AS sequence
+            FROM ticket_messages m
+            WHERE m.sequence IS NULL
+        ) AS numbered
+        WHERE ticket_messages.rowid = numbered.message_rowid
+        """
+    )
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_ticket_messages_ticket_id_sequence "
+        "ON ticket_messages (ticket_id, sequence)"
+    )
+
+
+def add_conversation_summary(connection: Connection):
+    columns = [
+        row[1] for row in connection.exec_driver_sql("PRAGMA table_info(tickets)")
+    ]
+    if "conversation_summary" not in columns:
+        connection.exec_driver_sql(
+            "ALTER TABLE tickets ADD COLUMN conversation_summary TEXT"
+        )
+    if "summarized_until_sequence" not in columns:
+        connection.exec_driver_sql(
+            "ALTER TABLE tickets ADD COLUMN summarized_until_sequence INTEGER"
+        )
+
+
+MIGRATIONS = [
+    Migration(1, "Add secondary indexes for the hot queries", add_secondary_indexes),
+    Migration(2, "Number the messages of every ticket", add_message_sequence),
+    Migration(3, "Keep the running summary of a ticket", add_conversation_summary),
+]
+
+QUERY_PLAN_CHECKS = [
+    QueryPlanCheck(
+        name="messages of a ticket",
+        sql="SELECT * FROM ticket_messages WHERE ticket_id = :ticket_id "
+        "ORDER BY sequence ASC",
+        parameters={"ticket_id": ""},
+        expected_index="ix_ticket_messages_ticket_id_sequence",
+    ),
+    QueryPlanCheck(
+        name="page of ticket messages",
+        sql="SELECT * FROM ticket_messages WHERE ticket_id = :ticket_id "
+        "AND sequence < :before_sequence ORDER BY sequence DESC LIMIT 21",
+        parameters={"ticket_id": "", "before_sequence": 0},
+        expected_index="ix_ticket_messages_ticket_id_sequence",
+    ),
+    QueryPlanCheck(
+        name="knowledge of an account",
+        sql="SELECT * FROM knowledge WHERE account_id = :account_id",
+        parameters={"account_id": ""},
+        expected_index="ix_knowledge_account_id",
+    ),
+    QueryPlanCheck(
+        name="tickets of a user",
+        sql="SELECT * FROM tickets WHERE user_id = :user_id",
+        parameters={"user_id": ""},
+        expected_index="ix_tickets_user_id",
+    ),
+]
+
+
+def get_schema_version(connection: Connection) -> int:
+    return connection.exec_driver_sql("PRAGMA user_version").scalar_one()
+
+
+def migrate(engine: Engine) -> list[int]:
+    """Apply all pending migrations and return the versions that were applied."""
+    applied = []
+    with engine.connect() as connection:
+        current_version = get_schema_version(connection)
+
+    for migration in MIGRATIONS:
+        if migration.version <= current_version:
+            continue
+
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.exec_driver_sql(f"PRAGMA user_version = {migration.version}")
+        applied.append(migration.version)
+
+    return applied
+
+
+def check_query_plans(engine: Engine) -> list[dict]:
+    """Run EXPLAIN QUERY PLAN for the hot queries and check the expected indexes.
+
+    A query passes if its plan searches the expected index and needs no
+    temporary B-tree for sorting.
+    """
+    results = []
+    with engine.connect() as connection:
+        for check in QUERY_PLAN_CHECKS:
+            plan = [
+                row.detail
+                for row in connection.execute(
+                    text(f"EXPLAIN QUERY PLAN {check.sql}"), check.parameters
+                )
+            ]
+            uses_index = any(check.expected_index in detail for detail in plan)
+            sorts = any("TEMP B-TREE" in detail for detail in plan)
+            results.append(
+                {
+                    "query": check.name,
+                    "expected_index": check.expected_index,
+                    "plan": plan,
+                    "ok": uses_index and not sorts,
+                }
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="starter/data/core/udahub.db")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Verify that the hot queries use their indexes",
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{Path(args.db).resolve()}")
+    applied = migrate(engine)
+    with engine.connect() as connection:
+        version = get_schema_version(connection)
+    print(f"Schema version {version}, applied migrations: {applied or 'none'}")
+
+    if args.check:
+        results = check_query_plans(engine)
+        for result in results:
+            status = "ok" if result["ok"] else "FAILED"
+            print(f"[{status}] {result['query']}: {' | '.join(result['plan'])}")
+        if not all(result["ok"] for result in results):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from chromadb.errors import NotFoundError
+from typing import Iterable, Optional
+
+import chromadb
+import threading
+
+
+class ChromaRegistry:
+    """Process-wide Chroma client and collection handles.
+
+    The client and every collection handle are opened once and then shared by
+    all requests, so tools no longer re-open the metadata store and reload the
+    HNSW segments on every call.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._client = None
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = chromadb.PersistentClient(path=self.path)
+        return self._client
+
+    def collection(self, name: str, metadata: Optional[dict] = None):
+        """Return the collection, creating it with `metadata` if it is missing."""
+        collection = self._collections.get(name)
+        if collection is None:
+            client = self.client
+            with self._lock:
+                collection = self._collections.get(name)
+                if collection is None:
+                    collection = client.get_or_create_collection(
+                        name=name, metadata=metadata
+                    )
+                    self._collections[name] = collection
+        return collection
+
+    def existing_collection(self, name: str):
+        """Return the collection, or None if it was never created."""
+        collection = self._collections.get(name)
+        if collection is None:
+            try:
+                collection = self.client.get_collection(name=name)
+            except NotFoundError:
+                return None
+            with self._lock:
+                collection = self._collections.setdefault(name, collection)
+        return collection
+
+    def names(self, prefix: str = "") -> list[str]:
+        return sorted(
+            collection.name
+            for collection in self.client.list_collections()
+            if collection.name.startswith(prefix)
+        )
+
+    def max_batch_size(self) -> int:
+        return self.client.get_max_batch_size()
+
+    def invalidate(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+
+    def warm(self, names: Iterable[str]):
+        """Open the given collections and load their indexes into memory."""
+        for name in names:
+            collection = self.collection(name)
+            sample = collection.peek(limit=1)
+            if len(sample["ids"]) > 0:
+                collection.query(
+                    query_embeddings=[sample["embeddings"][0]], n_results=1
+                )
@@ -1,6 +1,7 @@
-from sqlalchemy import select, create_engine
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from starter.data.models.cultpass import User, Reservation, Experience
+from starter.mcp_servers.engine_registry import engines
 from fastmcp import FastMCP
 from fastmcp.utilities.logging import get_logger
 from pydantic import BaseModel, Field
@@ -20,6 +21,10 @@ CULTPASS_DB_PATH = os.getenv(
 )
 CULTPASS_MCP_PORT = int(os.getenv("CULTPASS_MCP_PORT", "8003"))
 
+# Tools that write run one after another on the writer thread instead of racing
+# for the SQLite lock, and the event loop keeps serving the read tools.
+cultpass_writer = engines.writer(CULTPASS_DB_PATH)
+
 
 class GetUserArguments(BaseModel):
     user_id: str = Field(description="The ID of the user to retrieve.")
@@ -51,8 +56,7 @@ def yield_message(message: str) -> dict:
     },
 )
 def get_cultpass_user(user: GetUserArguments) -> dict:
-    engine = create_engine(CULTPASS_DB_PATH)
-    with Session(engine) as session:
+    with engines.session(CULTPASS_DB_PATH) as session:
         statement = (
             select(User)
             .where(User.user_id == user.user_id)
@@ -96,9 +100,9 @@ def get_cultpass_user(user: GetUserArguments) -> dict:
         "idempotentHint": False,
     },
 )
+@cultpass_writer.aserialized
 def cancel_subscription(user: GetUserArguments) -> dict:
-    engine = create_engine(CULTPASS_DB_PATH)
-    with Session(engine) as session:
+    with engines.session(CULTPASS_DB_PATH) as session:
         statement = (
             select(User)
             .where(User.user_id == user.user_id)
@@ -129,9 +133,9 @@ def cancel_subscription(user: GetUserArguments) -> dict:
         "idempotentHint": False,
     },
 )
+@cultpass_writer.aserialized
 def reactivate_subscription(user: GetUserArguments) -> dict:
-    engine = create_engine(CULTPASS_DB_PATH)
-    with Session(engine) as session:
+    with engines.session(CULTPASS_DB_PATH) as session:
         statement = (
             select(User)
             .where(User.user_id == user.user_id)
@@ -162,9 +166,9 @@ def reactivate_subscription(user: GetUserArguments) -> dict:
         "idempotentHint": False,
     },
 )
+@cultpass_writer.aserialized
 def upgrade_subscription(user: GetUserArguments) -> dict:
-    engine = create_engine(CULTPASS_DB_PATH)
-    with Session(engine) as session:
+    with engines.session(CULTPASS_DB_PATH) as session:
         statement = (
             select(User)
             .where(User.user_id == user.user_id)
@@ -198,8 +202,7 @@ def upgrade_subscription(user: GetUserArguments) -> dict:
     },
 )
 def get_reservations(user: GetUserArguments) -> list[dict]:
-    engine = create_engine(CULTPASS_DB_PATH)
-    with Session(engine) as session:
+    with engines.session(CULTPASS_DB_PATH) as session:
         statement = (
             select(Reservation)
             .where(Reservation.user_id == user.user_id)
@@ -247,9 +250,9 @@ class CancelReservationArguments(BaseModel):
         "idempotentHint": False,
     },
 )
+@cultpass_writer.aserialized
 def cancel_reservation(reservation: CancelReservationArguments) -> dict:
-    engine = create_engine(CULTPASS_DB_PATH)
-    with Session(engine) as session:
+    with engines.session(CULTPASS_DB_PATH) as session:
         statement = (
             select(Reservation)
             .where(
@@ -288,9 +291,9 @@ class MakeReservationArguments(BaseModel):
         "idempotentHint": False,
     },
 )
+@cultpass_writer.aserialized
 def make_reservation(reservation: MakeReservationArguments) -> dict:
-    engine = create_engine(CULTPASS_DB_PATH)
-    with Session(engine) as session:
+    with engines.session(CULTPASS_DB_PATH) as session:
         user_statement = (
             select(User)
             .where(User.user_id == reservation.user_id)
@@ -369,8 +372,7 @@ class GetExperienceArguments(BaseModel):
     },
 )
 def get_experience(experience: GetExperienceArguments) -> dict:
-    engine = create_engine(CULTPASS_DB_PATH)
-    with Session(engine) as session:
+    with engines.session(CULTPASS_DB_PATH) as session:
         statement = select(Experience).where(
             Experience.experience_id == experience.experience_id
         )
@@ -0,0 +1,165 @@
+from array import array
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+import hashlib
+import json
+import sqlite3
+import threading
+
+
+LOOKUP_CHUNK_SIZE = 500
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def embedding_model_id(embedding_function) -> str:
+    """Identify an embedding function by its Chroma name and config."""
+    name_of = getattr(embedding_function, "name", None)
+    name = name_of() if callable(name_of) else type(embedding_function).__name__
+    if name == "default":
+        # Chroma's default embedding function always runs all-MiniLM-L6-v2.
+        return "default/all-MiniLM-L6-v2"
+
+    get_config = getattr(embedding_function, "get_config", None)
+    config = get_config() if callable(get_config) else {}
+    return f"{name}/{json.dumps(config, sort_keys=True, default=str)}"
+
+
+class EmbeddingCache:
+    """Persistent embedding store keyed by content hash and embedding model id.
+
+    Documents that were embedded before are served from a local SQLite file,
+    so only new or changed documents are passed on to the embedding function.
+    Query texts are never written to disk. Their embeddings are kept in an
+    in-memory LRU of at most `max_query_entries` entries.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embedding_function,
+        model_id: Optional[str] = None,
+        max_query_entries: int = 1024,
+    ):
+        self.path = path
+        self.embedding_function = embedding_function
+        self.model_id = model_id or embedding_model_id(embedding_function)
+        self.max_query_entries = max_query_entries
+        self.hits = 0
+        self.misses = 0
+        self.query_hits = 0
+        self.query_misses = 0
+        self._lock = threading.Lock()
+        self._queries: OrderedDict[str, list[float]] = OrderedDict()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                content_hash TEXT NOT NULL,
+                model_id TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (content_hash, model_id)
+            )
+            """
+        )
+        self._connection.commit()
+
+    def _lookup(self, hashes: list[str]) -> dict[str, list[float]]:
+        found = {}
+        for i in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+            chunk = hashes[i : i + LOOKUP_CHUNK_SIZE]
+            placeholders = ",".join("?" for _ in chunk)
+            rows = self._connection.execute(
+                f"SELECT content_hash, vector FROM embeddings "
+                f"WHERE model_id = ? AND content_hash IN ({placeholders})",
+                [self.model_id, *chunk],
+            )
+            for key, vector in rows:
+                found[key] = array("f", vector).tolist()
+        return found
+
+    def _store(self, vectors: dict[str, list[float]]):
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO embeddings (content_hash, model_id, vector) "
+            "VALUES (?, ?, ?)",
+            [
+                (key, self.model_id, array("f", vector).tobytes())
+                for key, vector in vectors.items()
+            ],
+        )
+        self._connection.commit()
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        hashes = [content_hash(text) for text in texts]
+
+        with self._lock:
+            vectors = self._lookup(list(set(hashes)))
+
+            missing = {}
+            for key, text in zip(hashes, texts):
+                if key not in vectors:
+                    missing.setdefault(key, text)
+
+            self.hits += sum(1 for key in hashes if key not in missing)
+            self.misses += len(missing)
+
+        if missing:
+            computed = self.embedding_function(list(missing.values()))
+            new_vectors = {
+                key: [float(value) for value in vector]
+                for key, vector in zip(missing.keys(), computed)
+            }
+            with self._lock:
+                self._store(new_vectors)
+            vectors.update(new_vectors)
+
+        return [vectors[key] for key in hashes]
+
+    def embed_queries(self, texts: Sequence[str]) -> list[list[float]]:
+        """Embed query texts, reusing recent embeddings held in memory."""
+        hashes = [content_hash(text) for text in texts]
+
+        with self._lock:
+            vectors = {}
+            missing = {}
+            for key, text in zip(hashes, texts):
+                vector = self._queries.get(key)
+                if vector is not None:
+                    self._queries.move_to_end(key)
+                    vectors[key] = vector
+                else:
+                    missing.setdefault(key, text)
+
+            self.query_hits += sum(1 for key in hashes if key not in missing)
+            self.query_misses += len(missing)
+
+        if missing:
+            computed = self.embedding_function(list(missing.values()))
+            new_vectors = {
+                key: [float(value) for value in vector]
+                for key, vector in zip(missing.keys(), computed)
+            }
+            vectors.update(new_vectors)
+            if self.max_query_entries > 0:
+                with self._lock:
+                    self._queries.update(new_vectors)
+                    while len(self._queries) > self.max_query_entries:
+                        self._queries.popitem(last=False)
+
+        return [vectors[key] for key in hashes]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "path": self.path,
+                "model_id": self.model_id,
+                "hits": self.hits,
+                "misses": self.misses,
+                "query_entries": len(self._queries),
+                "max_query_entries": self.max_query_entries,
+                "query_hits": self.query_hits,
+                "query_misses": self.query_misses,
+            }
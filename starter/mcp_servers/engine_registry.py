@@ -0,0 +1,112 @@
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
+from starter.data.sqlite_setup import SQLITE_PRAGMAS, SerialWriter, set_sqlite_pragmas
+from dotenv import load_dotenv
+from typing import Optional
+
+import os
+import threading
+
+
+load_dotenv()
+
+MCP_DB_POOL_SIZE = int(os.getenv("MCP_DB_POOL_SIZE", "5"))
+MCP_DB_MAX_OVERFLOW = int(os.getenv("MCP_DB_MAX_OVERFLOW", "10"))
+MCP_DB_POOL_TIMEOUT = float(os.getenv("MCP_DB_POOL_TIMEOUT", "30"))
+MCP_DB_POOL_PRE_PING = os.getenv("MCP_DB_POOL_PRE_PING", "true").lower() == "true"
+
+
+class EngineRegistry:
+    """Process-wide SQLAlchemy engines of the MCP servers, one per database URL.
+
+    Every engine is built once with the pool settings and SQLite pragmas of the
+    registry, so tools only check out a pooled connection per request. Writes
+    to a database can be serialized through its `writer`.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_pre_ping: bool = True,
+        sqlite_pragmas: Optional[dict] = None,
+    ):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_pre_ping = pool_pre_ping
+        self.sqlite_pragmas = dict(sqlite_pragmas or {})
+        self._engines: dict[str, Engine] = {}
+        self._session_factories: dict[str, sessionmaker] = {}
+        self._writers: dict[str, SerialWriter] = {}
+        self._lock = threading.Lock()
+
+    def _create_engine(self, url: str) -> Engine:
+        parsed_url = make_url(url)
+        options = {"pool_pre_ping": self.pool_pre_ping}
+        # In-memory SQLite databases live in a single connection and cannot be pooled.
+        if parsed_url.database not in (None, "", ":memory:"):
+            options.update(
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+            )
+
+        engine = create_engine(url, **options)
+        if parsed_url.get_backend_name() == "sqlite" and self.sqlite_pragmas:
+            set_sqlite_pragmas(engine, self.sqlite_pragmas)
+        return engine
+
+    def engine(self, url: str) -> Engine:
+        engine = self._engines.get(url)
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get(url)
+                if engine is None:
+                    engine = self._create_engine(url)
+                    self._session_factories[url] = sessionmaker(bind=engine)
+                    self._engines[url] = engine
+        return engine
+
+    def session(self, url: str) -> Session:
+        """Open a session on a pooled connection of the engine for `url`."""
+        self.engine(url)
+        return self._session_factories[url]()
+
+    def writer(self, url: str) -> SerialWriter:
+        """Return the single-writer queue of the database at `url`."""
+        with self._lock:
+            writer = self._writers.get(url)
+            if writer is None:
+                writer = SerialWriter(url)
+                self._writers[url] = writer
+        return writer
+
+    def dispose(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._session_factories.clear()
+
+    def stats(self) -> dict:
+        return {
+            url: {
+                "pool": engine.pool.status(),
+                "pending_writes": self._writers[url].pending()
+                if url in self._writers
+                else 0,
+            }
+            for url, engine in self._engines.items()
+        }
+
+
+engines = EngineRegistry(
+    pool_size=MCP_DB_POOL_SIZE,
+    max_overflow=MCP_DB_MAX_OVERFLOW,
+    pool_timeout=MCP_DB_POOL_TIMEOUT,
+    pool_pre_ping=MCP_DB_POOL_PRE_PING,
+    sqlite_pragmas=SQLITE_PRAGMAS,
+)
@@ -0,0 +1,170 @@
+from collections import Counter
+from typing import Iterable, Optional
+
+import math
+import re
+import sqlite3
+import threading
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.casefold())
+
+
+def reciprocal_rank_fusion(rankings: Iterable[list[str]], k: int = 60) -> list[str]:
+    """Fuse several rankings of document ids into one (Cormack et al., 2009)."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+
+
+class KeywordIndex:
+    """Persistent inverted index with BM25 scoring, stored in a SQLite file.
+
+    Documents are grouped by collection and optionally by account, so keyword
+    search can be restricted to the same scope as the vector search.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                collection TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                account_id TEXT,
+                length INTEGER NOT NULL,
+                PRIMARY KEY (collection, doc_id)
+            );
+            CREATE INDEX IF NOT EXISTS ix_documents_scope
+                ON documents (collection, account_id);
+            CREATE TABLE IF NOT EXISTS postings (
+                collection TEXT NOT NULL,
+                term TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (collection, term, doc_id)
+            );
+            CREATE INDEX IF NOT EXISTS ix_postings_doc
+                ON postings (collection, doc_id);
+            CREATE TABLE IF NOT EXISTS built_collections (
+                collection TEXT PRIMARY KEY,
+                built_at TEXT NOT NULL
+            );
+            """
+        )
+        self._connection.commit()
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM documents WHERE collection = ?", [collection]
+            ).fetchone()[0]
+
+    def is_built(self, collection: str) -> bool:
+        """Whether a full sync has indexed the collection, even if it is empty."""
+        with self._lock:
+            return (
+                self._connection.execute(
+                    "SELECT 1 FROM built_collections WHERE collection = ?",
+                    [collection],
+                ).fetchone()
+                is not None
+            )
+
+    def mark_built(self, collection: str):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO built_collections (collection, built_at) "
+                "VALUES (?, datetime('now'))",
+                [collection],
+            )
+            self._connection.commit()
+
+    def _delete(self, collection: str, doc_ids: list[str]):
+        rows = [(collection, doc_id) for doc_id in doc_ids]
+        self._connection.executemany(
+            "DELETE FROM postings WHERE collection = ? AND doc_id = ?", rows
+        )
+        self._connection.executemany(
+            "DELETE FROM documents WHERE collection = ? AND doc_id = ?", rows
+        )
+
+    def upsert(
+        self, collection: str, documents: Iterable[tuple[str, Optional[str], str]]
+    ):
+        """Index `(doc_id, account_id, text)` tuples, replacing older versions."""
+        documents = list(documents)
+        with self._lock:
+            self._delete(collection, [doc_id for doc_id, _, _ in documents])
+            for doc_id, account_id, text in documents:
+                terms = Counter(tokenize(text))
+                self._connection.execute(
+                    "INSERT INTO documents (collection, doc_id, account_id, length) "
+                    "VALUES (?, ?, ?, ?)",
+                    [collection, doc_id, account_id, sum(terms.values())],
+                )
+                self._connection.executemany(
+                    "INSERT INTO postings (collection, term, doc_id, tf) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(collection, term, doc_id, tf) for term, tf in terms.items()],
+                )
+            self._connection.commit()
+
+    def delete(self, collection: str, doc_ids: Iterable[str]):
+        with self._lock:
+            self._delete(collection, list(doc_ids))
+            self._connection.commit()
+
+    def search(
+        self,
+        collection: str,
+        query_text: str,
+        n_results: int,
+        account_id: Optional[str] = None,
+    ) -> list[str]:
+        """Return the ids of the best matching documents, best match first."""
+        terms = sorted(set(tokenize(query_text)))
+        if not terms or n_results <= 0:
+            return []
+
+        scope = "d.collection = ?" + (" AND d.account_id = ?" if account_id else "")
+        scope_args = [collection] + ([account_id] if account_id else [])
+        placeholders = ",".join("?" for _ in terms)
+
+        with self._lock:
+            total, average_length = self._connection.execute(
+                f"SELECT COUNT(*), AVG(d.length) FROM documents d WHERE {scope}",
+                scope_args,
+            ).fetchone()
+            postings = self._connection.execute(
+                f"SELECT p.term, p.doc_id, p.tf, d.length FROM postings p "
+                f"JOIN documents d ON d.collection = p.collection AND d.doc_id = p.doc_id "
+                f"WHERE {scope} AND p.term IN ({placeholders})",
+                scope_args + terms,
+            ).fetchall()
+
+        if not total or not postings:
+            return []
+
+        document_frequency = Counter(term for term, _, _, _ in postings)
+        scores: dict[str, float] = {}
+        for term, doc_id, tf, length in postings:
+            df = document_frequency[term]
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * length / (average_length or 1))
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (
+                tf + norm
+            )
+
+        ranking = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+        return ranking[:n_results]
@@ -1,15 +1,30 @@
-from sqlalchemy import select, create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy import select, or_
 from starter.data.models.cultpass import Experience
 from starter.data.models.udahub import Knowledge
+from starter.mcp_servers.embedding_cache import EmbeddingCache
+from starter.mcp_servers.chroma_registry import ChromaRegistry
+from starter.mcp_servers.engine_registry import engines
+from starter.mcp_servers.query_cache import QueryCache, normalize_query
+from starter.mcp_servers.keyword_index import KeywordIndex, reciprocal_rank_fusion
 from fastmcp import FastMCP
+from fastmcp.utilities.logging import get_logger
 from pydantic import BaseModel, Field
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator, Literal, Optional
 
-import chromadb
+import asyncio
+import hashlib
+import json
 import os
+import re
+import threading
+import time
 
 load_dotenv()
+logger = get_logger("knowledgebase_mcp")
 
 
 CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_data")
@@ -18,25 +33,395 @@ CULTPASS_DB_PATH = os.getenv(
 )
 UDAHUB_DB_PATH = os.getenv("UDAHUB_DB_PATH", "sqlite:///starter/data/core/udahub.db")
 KNOWLEDGE_BASE_MCP_PORT = int(os.getenv("KNOWLEDGE_BASE_MCP_PORT", "8002"))
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "256"))
+KNOWLEDGE_BASE_SYNC_INTERVAL = int(os.getenv("KNOWLEDGE_BASE_SYNC_INTERVAL", "300"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "600"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(
+        os.path.dirname(os.path.abspath(CHROMA_DB_PATH)), "embedding_cache.db"
+    ),
+)
+
+KEYWORD_INDEX_PATH = os.getenv(
+    "KEYWORD_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(CHROMA_DB_PATH)), "keyword_index.db"),
+)
+HYBRID_CANDIDATE_FACTOR = 3
+
+embedding_cache = EmbeddingCache(
+    path=EMBEDDING_CACHE_PATH,
+    embedding_function=DefaultEmbeddingFunction(),
+    max_query_entries=QUERY_EMBEDDING_CACHE_SIZE,
+)
+
+
+SYNC_WATERMARK_KEY = "synced_until"
+SYNCED_AT_KEY = "synced_at"
+RECORD_VERSION_KEY = "record_version"
+# Bump the version of a collection whenever its record layout changes, so the
+# next sync rewrites every document instead of only the changed ones.
+RECORD_VERSIONS = {"cultpass": 2, "udahub": 1}
+
+# Serializes the background sync and syncs requested through the MCP tools.
+sync_locks = {"cultpass": threading.Lock(), "udahub": threading.Lock()}
+chroma = ChromaRegistry(CHROMA_DB_PATH)
+query_cache = QueryCache(max_entries=QUERY_CACHE_SIZE, ttl_seconds=QUERY_CACHE_TTL)
+keyword_index = KeywordIndex(KEYWORD_INDEX_PATH)
+KEYWORD_INDEXED_COLLECTIONS = {"udahub"}
+# Collections that are split into one Chroma collection per account. The
+# collection with the plain name keeps the sync state of all its shards.
+SHARDED_COLLECTIONS = {"udahub"}
+SHARD_OF_KEY = "shard_of"
+MAX_COLLECTION_NAME_LENGTH = 63
+
+RetrievalMode = Literal["vector", "keyword", "hybrid"]
+
+
+def changed_since(updated_at_column, updated_since: datetime):
+    # CURRENT_TIMESTAMP only has second resolution, so rows written within the
+    # same second as the watermark are read again instead of being missed.
+    return or_(
+        updated_at_column.is_(None),
+        updated_at_column > updated_since - timedelta(seconds=1),
+    )
+
+
+def iter_cultpass_experiences(
+    database_url: str,
+    updated_since: Optional[datetime] = None,
+    batch_size: int = SYNC_BATCH_SIZE,
+) -> Iterator[list[Experience]]:
+    with engines.session(database_url) as session:
+        stmt = select(Experience).execution_options(yield_per=batch_size)
+        if updated_since is not None:
+            stmt = stmt.where(changed_since(Experience.updated_at, updated_since))
+        for experiences in session.execute(stmt).scalars().partitions():
+            yield experiences
+
+
+def get_cultpass_experience_ids(database_url: str) -> set[str]:
+    with engines.session(database_url) as session:
+        stmt = select(Experience.experience_id)
+        return {f"experience_{id}" for id in session.execute(stmt).scalars()}
+
+
+def iter_udahub_knowledge(
+    database_url: str,
+    updated_since: Optional[datetime] = None,
+    batch_size: int = SYNC_BATCH_SIZE,
+) -> Iterator[list[Knowledge]]:
+    with engines.session(database_url) as session:
+        stmt = select(Knowledge).execution_options(yield_per=batch_size)
+        if updated_since is not None:
+            stmt = stmt.where(changed_since(Knowledge.updated_at, updated_since))
+        for entries in session.execute(stmt).scalars().partitions():
+            yield entries
+
+
+def get_udahub_knowledge_ids(database_url: str) -> set[str]:
+    with engines.session(database_url) as session:
+        stmt = select(Knowledge.article_id)
+        return {f"knowledge_{id}" for id in session.execute(stmt).scalars()}
+
+
+def get_sync_watermark(collection) -> Optional[datetime]:
+    """Return the high-water mark of the last sync stored on the collection."""
+    watermark = (collection.metadata or {}).get(SYNC_WATERMARK_KEY)
+    return datetime.fromisoformat(watermark) if watermark else None
+
+
+def get_synced_at(collection) -> Optional[datetime]:
+    """Return when the collection was last synchronized successfully."""
+    synced_at = (collection.metadata or {}).get(SYNCED_AT_KEY)
+    return datetime.fromisoformat(synced_at) if synced_at else None
+
+
+def is_sync_fresh(collection, max_age_seconds: Optional[int]) -> bool:
+    synced_at = get_synced_at(collection)
+    if max_age_seconds is None or synced_at is None:
+        return False
+
+    age = datetime.now(timezone.utc) - synced_at
+    return age.total_seconds() <= max_age_seconds
+
+
+def has_current_records(collection) -> bool:
+    stored_version = (collection.metadata or {}).get(RECORD_VERSION_KEY, 1)
+    return stored_version == RECORD_VERSIONS.get(collection.name, 1)
+
+
+def set_sync_state(collection, watermark: Optional[datetime]):
+    metadata = dict(collection.metadata or {})
+    if watermark is not None:
+        metadata[SYNC_WATERMARK_KEY] = watermark.isoformat()
+    metadata[SYNCED_AT_KEY] = datetime.now(timezone.utc).isoformat()
+    metadata[RECORD_VERSION_KEY] = RECORD_VERSIONS.get(collection.name, 1)
+    collection.modify(metadata=metadata)
+
+
+def next_sync_watermark(
+    watermark: Optional[datetime], rows: list
+) -> Optional[datetime]:
+    """Advance the watermark to the newest `updated_at` of the synchronized rows.
+
+    The watermark is taken from the source rows rather than the wall clock, so
+    clock skew between the databases and this server cannot skip any changes.
+    """
+    timestamps = [row.updated_at for row in rows if row.updated_at is not None]
+    if watermark is not None:
+        timestamps.append(watermark)
+    return max(timestamps) if timestamps else None
+
+
+def shard_name(collection_name: str, account_id: str) -> str:
+    """Return the name of the Chroma collection holding one account's documents.
+
+    Account ids that are not valid in a collection name are replaced by a
+    sanitized prefix plus a hash, so every account gets a distinct shard.
+    """
+    safe_id = re.sub(r"[^a-zA-Z0-9_-]", "-", account_id)
+    name = f"{collection_name}_{safe_id}"
+    if (
+        safe_id != account_id
+        or len(name) > MAX_COLLECTION_NAME_LENGTH
+        or not name[-1].isalnum()
+    ):
+        digest = hashlib.sha1(account_id.encode("utf-8")).hexdigest()[:10]
+        name = f"{collection_name}_{safe_id[:40]}_{digest}"
+    return name
+
+
+def storage_collection(
+    collection_name: str, account_id: Optional[str] = None, create: bool = True
+):
+    """Return the Chroma collection storing the documents of an account.
+
+    Shards are created lazily. With `create=False` a missing shard is None.
+    """
+    if collection_name not in SHARDED_COLLECTIONS or account_id is None:
+        return chroma.collection(collection_name)
+
+    name = shard_name(collection_name, account_id)
+    if not create:
+        return chroma.existing_collection(name)
+    return chroma.collection(
+        name, metadata={SHARD_OF_KEY: collection_name, "account_id": account_id}
+    )
+
+
+def shard_collections(collection_name: str) -> list:
+    shards = [
+        chroma.existing_collection(name) for name in chroma.names(f"{collection_name}_")
+    ]
+    return [
+        shard
+        for shard in shards
+        if shard is not None
+        and (shard.metadata or {}).get(SHARD_OF_KEY) == collection_name
+    ]
+
+
+def stored_collections(collection_name: str) -> list:
+    """Return every Chroma collection that may hold documents of a collection."""
+    if collection_name not in SHARDED_COLLECTIONS:
+        return [chroma.collection(collection_name)]
+    return [chroma.collection(collection_name), *shard_collections(collection_name)]
+
+
+def upsert_records(
+    collection_name: str, records: Iterable[tuple[str, str, dict, list[float]]]
+):
+    """Upsert `(id, document, metadata, embedding)` tuples with one call per account."""
+    by_account: dict[Optional[str], list] = {}
+    for record in records:
+        by_account.setdefault(record[2].get("account_id"), []).append(record)
+
+    for account_id, account_records in by_account.items():
+        ids, documents, metadatas, embeddings = zip(*account_records)
+        storage_collection(collection_name, account_id).upsert(
+            ids=list(ids),
+            documents=list(documents),
+            embeddings=list(embeddings),
+            metadatas=list(metadatas),
+        )
+
 
+def stored_metadata(metadata: dict) -> dict:
+    # Chroma drops metadata keys whose value is None.
+    return {key: value for key, value in metadata.items() if value is not None}
 
-def get_cultpass_experiences(database_url: str):
-    engine = create_engine(database_url)
-    with Session(engine) as session:
-        stmt = select(Experience)
-        experiences = session.execute(stmt).scalars().all()
-        return experiences
 
+def changed_records(
+    collection_name: str, records: list[tuple[str, str, dict]]
+) -> list[tuple[str, str, dict]]:
+    """Return the `(id, document, metadata)` records that differ from the stored ones.
 
-def get_udahub_knowledge(database_url: str):
-    engine = create_engine(database_url)
-    with Session(engine) as session:
-        stmt = select(Knowledge)
-        entries = session.execute(stmt).scalars().all()
-        return entries
+    Delta syncs read the rows around the watermark again, so most of them are
+    already stored unchanged and must neither be written nor invalidate caches.
+    """
+    by_account: dict[Optional[str], list] = {}
+    for record in records:
+        by_account.setdefault(record[2].get("account_id"), []).append(record)
 
+    stored = {}
+    for account_id, account_records in by_account.items():
+        collection = storage_collection(collection_name, account_id, create=False)
+        if collection is None:
+            continue
+        result = collection.get(
+            ids=[record[0] for record in account_records],
+            include=["documents", "metadatas"],
+        )
+        stored.update(zip(result["ids"], zip(result["documents"], result["metadatas"])))
+
+    return [
+        (id, document, metadata)
+        for id, document, metadata in records
+        if stored.get(id) != (document, stored_metadata(metadata))
+    ]
+
+
+def upsert_batches(
+    collection_name: str,
+    batches: Iterable[list],
+    to_record: Callable[[object], tuple[str, str, dict]],
+    watermark: Optional[datetime] = None,
+    reindex_keywords: bool = False,
+) -> tuple[int, Optional[datetime]]:
+    """Embed every batch of new or changed source rows and upsert it into Chroma.
+
+    Sharded collections get one upsert per account in the batch, all others a
+    single one. Rows that are stored unchanged are skipped; with
+    `reindex_keywords` they are still added to the keyword index. Returns the
+    number of upserted rows and the advanced watermark.
+    """
+    upserted = 0
+    for rows in batches:
+        records = [to_record(row) for row in rows]
+        changed = changed_records(collection_name, records)
+        if changed:
+            ids, documents, metadatas = zip(*changed)
+            upsert_records(
+                collection_name,
+                zip(ids, documents, metadatas, embedding_cache.embed(documents)),
+            )
+        indexed = records if reindex_keywords else changed
+        if collection_name in KEYWORD_INDEXED_COLLECTIONS and indexed:
+            keyword_index.upsert(
+                collection_name,
+                [
+                    (id, metadata.get("account_id"), f"{metadata['title']}\n{document}")
+                    for id, document, metadata in indexed
+                ],
+            )
+        upserted += len(changed)
+        watermark = next_sync_watermark(watermark, rows)
+
+    return upserted, watermark
+
+
+def migrate_to_shards(collection_name: str, batch_size: int) -> int:
+    """Move the documents of an unsharded collection into per-account shards.
+
+    The stored embeddings are copied along, so nothing is embedded again.
+    Returns the number of moved documents.
+    """
+    collection = chroma.collection(collection_name)
+    ids = collection.get(include=[])["ids"]
+    for i in range(0, len(ids), batch_size):
+        stored = collection.get(
+            ids=ids[i : i + batch_size],
+            include=["documents", "metadatas", "embeddings"],
+        )
+        upsert_records(
+            collection_name,
+            zip(
+                stored["ids"],
+                stored["documents"],
+                stored["metadatas"],
+                stored["embeddings"],
+            ),
+        )
+        collection.delete(ids=stored["ids"])
+
+    if ids:
+        logger.info(f"Moved {len(ids)} documents of '{collection_name}' into shards")
+    return len(ids)
+
+
+def sync_report(
+    collection_name: str,
+    full_sync: bool,
+    batch_size: int,
+    upserted: int,
+    deleted: int,
+    watermark: Optional[datetime],
+    started_at: float,
+) -> dict:
+    duration = time.perf_counter() - started_at
+    return {
+        "collection": collection_name,
+        "mode": "full" if full_sync else "delta",
+        "batch_size": batch_size,
+        "upserted": upserted,
+        "deleted": deleted,
+        "synced_until": watermark.isoformat() if watermark else None,
+        "duration_seconds": round(duration, 3),
+        "rows_per_second": round(upserted / duration, 1) if duration > 0 else None,
+    }
+
+
+def remove_tombstones(collection_name: str, live_ids: set[str]) -> int:
+    """Delete documents whose source rows no longer exist."""
+    deleted = []
+    for collection in stored_collections(collection_name):
+        stored_ids = set(collection.get(include=[])["ids"])
+        tombstones = sorted(stored_ids - live_ids)
+        if tombstones:
+            collection.delete(ids=tombstones)
+            deleted.extend(tombstones)
+
+    if deleted and collection_name in KEYWORD_INDEXED_COLLECTIONS:
+        keyword_index.delete(collection_name, deleted)
+    return len(deleted)
+
+
+def warm_collections():
+    chroma.warm(["cultpass", *[shard.name for shard in shard_collections("udahub")]])
+
+
+async def run_background_sync(interval_seconds: int):
+    """Keep the knowledgebase in sync without blocking any chat session."""
+    while True:
+        for sync in (sync_cultpass_collection, sync_udahub_collection):
+            try:
+                report = await asyncio.to_thread(sync, KnowledgeBaseSyncOptions())
+                logger.debug(f"Background sync finished: {report}")
+            except Exception as e:
+                logger.error(f"Background sync failed: {e}")
+
+        await asyncio.sleep(interval_seconds)
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    await asyncio.to_thread(warm_collections)
 
-mcp = FastMCP("UDA Hub Knowledgebase MCP Server")
+    task = None
+    if KNOWLEDGE_BASE_SYNC_INTERVAL > 0:
+        task = asyncio.create_task(run_background_sync(KNOWLEDGE_BASE_SYNC_INTERVAL))
+
+    try:
+        yield {}
+    finally:
+        if task is not None:
+            task.cancel()
+
+
+mcp = FastMCP("UDA Hub Knowledgebase MCP Server", lifespan=lifespan)
 
 
 @mcp.resource(
@@ -52,9 +437,161 @@ def get_knowledgebase_config():
         "chroma_db_path": CHROMA_DB_PATH,
         "cultpass_db_path": CULTPASS_DB_PATH,
         "udahub_db_path": UDAHUB_DB_PATH,
+        "embedding_cache": embedding_cache.stats(),
+        "query_cache": query_cache.stats(),
+        "udahub_shards": len(shard_collections("udahub")),
+        "db_pools": engines.stats(),
     }
 
 
+class KnowledgeBaseSyncOptions(BaseModel):
+    full_sync: bool = Field(
+        False,
+        description="Ignore the stored high-water mark and re-synchronize every row",
+    )
+    batch_size: int = Field(
+        SYNC_BATCH_SIZE,
+        description="The number of rows that are embedded and upserted together",
+        ge=1,
+    )
+    max_age_seconds: Optional[int] = Field(
+        None,
+        description="Skip the sync if the collection was synchronized within this many seconds",
+        ge=0,
+    )
+
+
+def to_timestamp(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def experience_record(exp: Experience) -> tuple[str, str, dict]:
+    region, _, country = exp.location.rpartition(",")
+    return (
+        f"experience_{exp.experience_id}",
+        exp.description,
+        {
+            "type": "experience",
+            "experience_id": exp.experience_id,
+            "title": exp.title,
+            "location": exp.location,
+            "region": region.strip().casefold(),
+            "country": country.strip().casefold(),
+            "when": exp.when.isoformat(),
+            "when_ts": to_timestamp(exp.when),
+            "is_premium": bool(exp.is_premium),
+            "slots_available": exp.slots_available,
+        },
+    )
+
+
+def knowledge_record(entry: Knowledge) -> tuple[str, str, dict]:
+    return (
+        f"knowledge_{entry.article_id}",
+        entry.content,
+        {
+            "type": "knowledge",
+            "title": entry.title,
+            "article_id": entry.article_id,
+            "account_id": entry.account_id,
+            "tags": entry.tags,
+        },
+    )
+
+
+def skipped_sync_report(collection_name: str, collection) -> dict:
+    return {
+        "collection": collection_name,
+        "mode": "skipped",
+        "synced_at": get_synced_at(collection).isoformat(),
+    }
+
+
+def sync_cultpass_collection(options: KnowledgeBaseSyncOptions) -> dict:
+    with sync_locks["cultpass"]:
+        started_at = time.perf_counter()
+        collection = chroma.collection("cultpass")
+        full_sync = options.full_sync or not has_current_records(collection)
+        if not full_sync and is_sync_fresh(collection, options.max_age_seconds):
+            return skipped_sync_report("cultpass", collection)
+
+        batch_size = min(options.batch_size, chroma.max_batch_size())
+        watermark = None if full_sync else get_sync_watermark(collection)
+        upserted, watermark = upsert_batches(
+            "cultpass",
+            iter_cultpass_experiences(
+                CULTPASS_DB_PATH, updated_since=watermark, batch_size=batch_size
+            ),
+            experience_record,
+            watermark,
+        )
+
+        deleted = remove_tombstones(
+            "cultpass", get_cultpass_experience_ids(CULTPASS_DB_PATH)
+        )
+        if upserted or deleted:
+            query_cache.bump_version("cultpass")
+        set_sync_state(collection, watermark)
+
+        return sync_report(
+            "cultpass",
+            full_sync,
+            batch_size,
+            upserted,
+            deleted,
+            watermark,
+            started_at,
+        )
+
+
+def sync_udahub_collection(options: KnowledgeBaseSyncOptions) -> dict:
+    with sync_locks["udahub"]:
+        started_at = time.perf_counter()
+        # Holds the sync state, the documents live in the per-account shards.
+        collection = chroma.collection("udahub")
+        # A missing keyword index can only be rebuilt by reading every row.
+        rebuild_index = not keyword_index.is_built("udahub")
+        full_sync = (
+            options.full_sync or not has_current_records(collection) or rebuild_index
+        )
+        if not full_sync and is_sync_fresh(collection, options.max_age_seconds):
+            return skipped_sync_report("udahub", collection)
+
+        batch_size = min(options.batch_size, chroma.max_batch_size())
+        migrated = migrate_to_shards("udahub", batch_size)
+        watermark = None if full_sync else get_sync_watermark(collection)
+        upserted, watermark = upsert_batches(
+            "udahub",
+            iter_udahub_knowledge(
+                UDAHUB_DB_PATH, updated_since=watermark, batch_size=batch_size
+            ),
+            knowledge_record,
+            watermark,
+            reindex_keywords=full_sync,
+        )
+
+        deleted = remove_tombstones("udahub", get_udahub_knowledge_ids(UDAHUB_DB_PATH))
+        if upserted or deleted or migrated or rebuild_index:
+            query_cache.bump_version("udahub")
+        set_sync_state(collection, watermark)
+        if full_sync:
+            keyword_index.mark_built("udahub")
+
+        report = sync_report(
+            "udahub",
+            full_sync,
+            batch_size,
+            upserted,
+            deleted,
+            watermark,
+            started_at,
+        )
+        report["migrated"] = migrated
+        return report
+
+
 @mcp.tool(
     name="sync_cultpass_experiences",
     description="Synchronize the Cultpass experiences into the knowledgebase.",
@@ -66,24 +603,12 @@ def get_knowledgebase_config():
         "idempotentHint": True,
     },
 )
-def sync_cultpass_experiences():
-    chroma_client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-    experiences = get_cultpass_experiences(CULTPASS_DB_PATH)
-
-    collection = chroma_client.get_or_create_collection(name="cultpass")
-
-    for exp in experiences:
-        collection.upsert(
-            documents=[exp.description],
-            metadatas=[
-                {
-                    "type": "experience",
-                    "experience_id": exp.experience_id,
-                    "title": exp.title,
-                }
-            ],
-            ids=[f"experience_{exp.experience_id}"],
-        )
+async def sync_cultpass_experiences(
+    options: KnowledgeBaseSyncOptions = KnowledgeBaseSyncOptions(),
+) -> dict:
+    # The sync may wait for the background sync's lock, so it runs on a
+    # thread instead of the event loop that serves the query tools.
+    return await asyncio.to_thread(sync_cultpass_collection, options)
 
 
 @mcp.tool(
@@ -97,26 +622,10 @@ def sync_cultpass_experiences():
         "idempotentHint": True,
     },
 )
-def sync_udahub_knowledgebase():
-    chroma_client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-    knowledge_entries = get_udahub_knowledge(UDAHUB_DB_PATH)
-
-    collection = chroma_client.get_or_create_collection(name="udahub")
-
-    for entry in knowledge_entries:
-        collection.upsert(
-            documents=[entry.content],
-            metadatas=[
-                {
-                    "type": "knowledge",
-                    "title": entry.title,
-                    "article_id": entry.article_id,
-                    "account_id": entry.account_id,
-                    "tags": entry.tags,
-                }
-            ],
-            ids=[f"knowledge_{entry.article_id}"],
-        )
+async def sync_udahub_knowledgebase(
+    options: KnowledgeBaseSyncOptions = KnowledgeBaseSyncOptions(),
+) -> dict:
+    return await asyncio.to_thread(sync_udahub_collection, options)
 
 
 class KnowledgeBaseEntry(BaseModel):
@@ -135,6 +644,22 @@ class UdaHubKnowledgeEntry(KnowledgeBaseEntry):
     )
 
 
+class CultpassExperience(KnowledgeBaseEntry):
+    experience_id: str = Field(
+        description="The unique identifier for the Cultpass experience"
+    )
+    location: Optional[str] = Field(
+        None, description="Where the experience takes place"
+    )
+    when: Optional[str] = Field(None, description="When the experience takes place")
+    is_premium: Optional[bool] = Field(
+        None, description="Whether a premium subscription is needed"
+    )
+    slots_available: Optional[int] = Field(
+        None, description="The number of slots that can still be reserved"
+    )
+
+
 class KnowledgeBaseQuery(BaseModel):
     query_text: str = Field(
         description="The search query string for a semantic search in a vector database"
@@ -150,6 +675,257 @@ class UdaHubKnowledgeBaseQuery(KnowledgeBaseQuery):
     account_id: str = Field(
         description="The ID of the UdaHub account to filter the knowledge entries by"
     )
+    mode: RetrievalMode = Field(
+        "hybrid",
+        description="'vector' for a semantic search, 'keyword' for a BM25 keyword search or 'hybrid' to combine both",
+    )
+
+
+class KnowledgeBaseBatchQuery(BaseModel):
+    query_texts: list[str] = Field(
+        description="The search query strings for a semantic search in a vector database",
+        min_length=1,
+        max_length=10,
+    )
+    n_results: int = Field(
+        description="The number of results to return for each query",
+        ge=0,
+        le=10,
+    )
+
+
+class CultpassExperienceFilter(BaseModel):
+    country: Optional[str] = Field(
+        None, description="Only return experiences in this country, e.g. 'Brazil'"
+    )
+    region: Optional[str] = Field(
+        None,
+        description="Only return experiences in this city, state or region, e.g. 'Bahia'",
+    )
+    is_premium: Optional[bool] = Field(
+        None,
+        description="Only return premium (true) or non-premium (false) experiences",
+    )
+    min_slots_available: Optional[int] = Field(
+        None,
+        description="Only return experiences with at least this many free slots",
+        ge=0,
+    )
+    starts_after: Optional[datetime] = Field(
+        None, description="Only return experiences taking place at or after this time"
+    )
+    starts_before: Optional[datetime] = Field(
+        None, description="Only return experiences taking place at or before this time"
+    )
+
+    def to_where(self) -> Optional[dict]:
+        clauses = []
+        if self.country:
+            clauses.append({"country": self.country.strip().casefold()})
+        if self.region:
+            clauses.append({"region": self.region.strip().casefold()})
+        if self.is_premium is not None:
+            clauses.append({"is_premium": self.is_premium})
+        if self.min_slots_available is not None:
+            clauses.append({"slots_available": {"$gte": self.min_slots_available}})
+        if self.starts_after is not None:
+            clauses.append({"when_ts": {"$gte": to_timestamp(self.starts_after)}})
+        if self.starts_before is not None:
+            clauses.append({"when_ts": {"$lte": to_timestamp(self.starts_before)}})
+
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class CultpassExperienceQuery(KnowledgeBaseQuery, CultpassExperienceFilter):
+    pass
+
+
+class CultpassExperienceBatchQuery(KnowledgeBaseBatchQuery, CultpassExperienceFilter):
+    pass
+
+
+class UdaHubKnowledgeBaseBatchQuery(KnowledgeBaseBatchQuery):
+    account_id: str = Field(
+        description="The ID of the UdaHub account to filter the knowledge entries by"
+    )
+    mode: RetrievalMode = Field(
+        "hybrid",
+        description="'vector' for a semantic search, 'keyword' for a BM25 keyword search or 'hybrid' to combine both",
+    )
+
+
+def udahub_entries(query_result) -> list[list[dict]]:
+    grouped = []
+    for ids, metadatas, documents in zip(
+        query_result["ids"], query_result["metadatas"], query_result["documents"]
+    ):
+        grouped.append(
+            [
+                UdaHubKnowledgeEntry(
+                    collection="udahub",
+                    chromadb_id=ids[i],
+                    title=metadatas[i]["title"],
+                    content=documents[i],
+                    article_id=metadatas[i]["article_id"],
+                    account_id=metadatas[i]["account_id"],
+                ).model_dump()
+                for i in range(len(ids))
+            ]
+        )
+    return grouped
+
+
+def cultpass_entries(query_result) -> list[list[dict]]:
+    grouped = []
+    for ids, metadatas, documents in zip(
+        query_result["ids"], query_result["metadatas"], query_result["documents"]
+    ):
+        grouped.append(
+            [
+                CultpassExperience(
+                    collection="cultpass",
+                    chromadb_id=ids[i],
+                    title=metadatas[i]["title"],
+                    content=documents[i],
+                    experience_id=metadatas[i]["experience_id"],
+                    location=metadatas[i].get("location"),
+                    when=metadatas[i].get("when"),
+                    is_premium=metadatas[i].get("is_premium"),
+                    slots_available=metadatas[i].get("slots_available"),
+                ).model_dump()
+                for i in range(len(ids))
+            ]
+        )
+    return grouped
+
+
+RESULT_KEYS = ("ids", "documents", "metadatas")
+
+
+def query_collection(
+    collection_name: str,
+    account_id: Optional[str],
+    query_texts: list[str],
+    n_results: int,
+    to_entries: Callable[[dict], list[list[dict]]],
+    mode: RetrievalMode = "vector",
+    where: Optional[dict] = None,
+) -> list[list[dict]]:
+    """Answer every query text from the cache or with a single Chroma query.
+
+    All query texts that miss the cache are embedded together and sent to
+    Chroma in one call. In 'keyword' and 'hybrid' mode the BM25 keyword index
+    is searched as well, and hybrid rankings are merged by reciprocal rank
+    fusion. `where` is pushed down to Chroma as an additional metadata filter.
+    The results are grouped per query text.
+    """
+    filters = json.dumps(where, sort_keys=True) if where else None
+    keys = [
+        (collection_name, account_id, normalize_query(text), n_results, mode, filters)
+        for text in query_texts
+    ]
+    # Read before the lookup, so results of a sync that finishes meanwhile
+    # are not cached under the new version.
+    version = query_cache.version(collection_name)
+    results = [query_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+
+    # Shards only hold the documents of one account and need no account filter.
+    collection = storage_collection(collection_name, account_id, create=False)
+    if account_id and collection_name not in SHARDED_COLLECTIONS:
+        account_filter = {"account_id": account_id}
+        where = {"$and": [account_filter, where]} if where else account_filter
+
+    if collection is None:
+        query_result = {key: [[] for _ in missing] for key in RESULT_KEYS}
+    elif mode == "vector":
+        query_result = collection.query(
+            query_embeddings=embedding_cache.embed_queries(
+                [query_texts[i] for i in missing]
+            ),
+            where=where,
+            n_results=n_results,
+        )
+    else:
+        query_result = hybrid_query(
+            collection,
+            collection_name,
+            account_id,
+            [query_texts[i] for i in missing],
+            n_results,
+            mode,
+            where,
+        )
+
+    for i, entries in zip(missing, to_entries(query_result)):
+        query_cache.put(keys[i], entries, version)
+        results[i] = entries
+
+    return results
+
+
+def hybrid_query(
+    collection,
+    collection_name: str,
+    account_id: Optional[str],
+    query_texts: list[str],
+    n_results: int,
+    mode: RetrievalMode,
+    where: Optional[dict] = None,
+) -> dict:
+    """Rank documents by BM25, optionally fused with the vector ranking.
+
+    Returns the same grouped structure as `collection.query`.
+    """
+    candidates = n_results * HYBRID_CANDIDATE_FACTOR
+    rankings = [
+        [
+            keyword_index.search(collection_name, text, candidates, account_id)
+            for text in query_texts
+        ]
+    ]
+    documents, metadatas = {}, {}
+    if mode == "hybrid":
+        vector_result = collection.query(
+            query_embeddings=embedding_cache.embed_queries(query_texts),
+            where=where,
+            n_results=candidates,
+        )
+        rankings.append(vector_result["ids"])
+        for group in zip(
+            vector_result["ids"],
+            vector_result["documents"],
+            vector_result["metadatas"],
+        ):
+            for id, document, metadata in zip(*group):
+                documents[id] = document
+                metadatas[id] = metadata
+
+    ranked_ids = [
+        reciprocal_rank_fusion(per_text_rankings)[:n_results]
+        for per_text_rankings in zip(*rankings)
+    ]
+
+    unknown_ids = sorted({id for ids in ranked_ids for id in ids} - documents.keys())
+    if unknown_ids:
+        stored = collection.get(ids=unknown_ids, include=["documents", "metadatas"])
+        for id, document, metadata in zip(
+            stored["ids"], stored["documents"], stored["metadatas"]
+        ):
+            documents[id] = document
+            metadatas[id] = metadata
+
+    # Ids that are in the keyword index but not in Chroma are skipped.
+    ranked_ids = [[id for id in ids if id in documents] for ids in ranked_ids]
+    return {
+        "ids": ranked_ids,
+        "documents": [[documents[id] for id in ids] for ids in ranked_ids],
+        "metadatas": [[metadatas[id] for id in ids] for ids in ranked_ids],
+    }
 
 
 @mcp.tool(
@@ -164,33 +940,42 @@ class UdaHubKnowledgeBaseQuery(KnowledgeBaseQuery):
     },
 )
 def query_udahub_knowledgebase(query: UdaHubKnowledgeBaseQuery) -> list[dict] | dict:
-    chroma_client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-    collection = chroma_client.get_collection(name="udahub")
-    query_result = collection.query(
-        query_texts=[query.query_text],
-        where={"account_id": query.account_id},
-        n_results=query.n_results,
-    )
-
-    result = []
-    for i in range(len(query_result["ids"][0])):
-        entry = UdaHubKnowledgeEntry(
-            collection="udahub",
-            chromadb_id=query_result["ids"][0][i],
-            title=query_result["metadatas"][0][i]["title"],
-            content=query_result["documents"][0][i],
-            article_id=query_result["metadatas"][0][i]["article_id"],
-            account_id=query_result["metadatas"][0][i]["account_id"],
-        )
-        result.append(entry.model_dump())
+    return query_collection(
+        "udahub",
+        query.account_id,
+        [query.query_text],
+        query.n_results,
+        udahub_entries,
+        query.mode,
+    )[0]
 
-    return result
 
-
-class CultpassExperience(KnowledgeBaseEntry):
-    experience_id: str = Field(
-        description="The unique identifier for the Cultpass experience"
+@mcp.tool(
+    name="query_udahub_knowledgebase_batch",
+    description="Query the UdaHub knowledgebase with several questions at once. Returns the results grouped per question.",
+    tags=set(["cultpass", "query", "knowledge", "faq", "learning", "batch"]),
+    meta={"author": "UDAHub Knowledge Base", "version": "1.0"},
+    annotations={
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": True,
+    },
+)
+def query_udahub_knowledgebase_batch(
+    query: UdaHubKnowledgeBaseBatchQuery,
+) -> list[dict]:
+    results = query_collection(
+        "udahub",
+        query.account_id,
+        query.query_texts,
+        query.n_results,
+        udahub_entries,
+        query.mode,
     )
+    return [
+        {"query_text": query_text, "results": entries}
+        for query_text, entries in zip(query.query_texts, results)
+    ]
 
 
 @mcp.tool(
@@ -204,26 +989,43 @@ class CultpassExperience(KnowledgeBaseEntry):
         "idempotentHint": True,
     },
 )
-def query_cultpass_experiences(query: KnowledgeBaseQuery) -> list[dict] | dict:
-    chroma_client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-    collection = chroma_client.get_collection(name="cultpass")
-    query_result = collection.query(
-        query_texts=[query.query_text],
-        n_results=query.n_results,
-    )
-
-    result = []
-    for i in range(len(query_result["ids"][0])):
-        entry = CultpassExperience(
-            collection="cultpass",
-            chromadb_id=query_result["ids"][0][i],
-            title=query_result["metadatas"][0][i]["title"],
-            content=query_result["documents"][0][i],
-            experience_id=query_result["metadatas"][0][i]["experience_id"],
-        )
-        result.append(entry.model_dump())
+def query_cultpass_experiences(query: CultpassExperienceQuery) -> list[dict] | dict:
+    return query_collection(
+        "cultpass",
+        None,
+        [query.query_text],
+        query.n_results,
+        cultpass_entries,
+        where=query.to_where(),
+    )[0]
+
 
-    return result
+@mcp.tool(
+    name="query_cultpass_experiences_batch",
+    description="Query the experiences which Cultpass offers with several searches at once. Returns the results grouped per search.",
+    tags=set(["cultpass", "query", "knowledge", "experiences", "browsing", "batch"]),
+    meta={"author": "UDAHub Knowledge Base", "version": "1.0"},
+    annotations={
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": True,
+    },
+)
+def query_cultpass_experiences_batch(
+    query: CultpassExperienceBatchQuery,
+) -> list[dict]:
+    results = query_collection(
+        "cultpass",
+        None,
+        query.query_texts,
+        query.n_results,
+        cultpass_entries,
+        where=query.to_where(),
+    )
+    return [
+        {"query_text": query_text, "results": entries}
+        for query_text, entries in zip(query.query_texts, results)
+    ]
 
 
 if __name__ == "__main__":
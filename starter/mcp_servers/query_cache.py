@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import threading
+import time
+
+
+def normalize_query(query_text: str) -> str:
+    return " ".join(query_text.casefold().split())
+
+
+class QueryCache:
+    """In-process LRU cache with TTL for knowledgebase query results.
+
+    Keys start with the collection name. Bumping the version of a collection
+    drops every cached result of it, which the sync tools do after each write.
+    Results are only stored if the version they were read at is still current,
+    so a query that overlapped a sync cannot bring back stale results.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[Hashable, ...]) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def version(self, collection: str) -> int:
+        with self._lock:
+            return self._versions.get(collection, 0)
+
+    def put(self, key: tuple[Hashable, ...], value: Any, version: Optional[int] = None):
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if version is not None and version != self._versions.get(key[0], 0):
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump_version(self, collection: str):
+        with self._lock:
+            self._versions[collection] = self._versions.get(collection, 0) + 1
+            for key in [key for key in self._entries if key[0] == collection]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "versions": dict(self._versions),
+            }
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from starter.agentic.checkpointer import AUTO_VACUUM_INCREMENTAL, BoundedSqliteSaver
+
+
+class BoundedSqliteSaverTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "checkpoints.db")
+
+    def saver(self, keep_last: int = 2, idle_ttl: float = 60) -> BoundedSqliteSaver:
+        saver = BoundedSqliteSaver.from_path(
+            self.path, keep_last=keep_last, idle_ttl=idle_ttl
+        )
+        saver.setup()
+        self.addCleanup(saver.close)
+        return saver
+
+    def put(self, saver: BoundedSqliteSaver, thread_id: str, checkpoint_ns: str = ""):
+        config = {
+            "configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        }
+        return saver.put(config, empty_checkpoint(), {}, {})
+
+    def checkpoint_ids(self, saver: BoundedSqliteSaver, thread_id: str) -> list:
+        return [
+            checkpoint.config["configurable"]["checkpoint_id"]
+            for checkpoint in saver.list({"configurable": {"thread_id": thread_id}})
+        ]
+
+    def test_only_the_last_checkpoints_are_kept(self):
+        saver = self.saver(keep_last=2)
+
+        configs = [self.put(saver, "t1") for _ in range(4)]
+        self.put(saver, "t2")
+
+        self.assertEqual(
+            self.checkpoint_ids(saver, "t1"),
+            [config["configurable"]["checkpoint_id"] for config in configs[:1:-1]],
+        )
+        self.assertEqual(len(self.checkpoint_ids(saver, "t2")), 1)
+
+    def test_root_checkpoints_prune_older_sub_namespaces(self):
+        saver = self.saver(keep_last=1)
+
+        self.put(saver, "t1")
+        self.put(saver, "t1", checkpoint_ns="agent:1")
+        self.put(saver, "t1")
+
+        self.assertEqual(saver.stats()["checkpoints"], 1)
+
+    def test_idle_threads_are_evicted(self):
+        saver = self.saver(idle_ttl=60)
+        self.put(saver, "idle")
+
+        with mock.patch("time.time", return_value=time.time() + 30):
+            self.put(saver, "active")
+        with mock.patch("time.time", return_value=time.time() + 61):
+            result = saver.compact()
+
+        self.assertEqual(result["evicted_threads"], 1)
+        self.assertEqual(self.checkpoint_ids(saver, "idle"), [])
+        self.assertEqual(len(self.checkpoint_ids(saver, "active")), 1)
+        self.assertEqual(saver.stats()["threads"], 1)
+
+    def test_compact_prunes_with_a_lower_keep_last(self):
+        saver = self.saver(keep_last=5)
+        for _ in range(4):
+            self.put(saver, "t1")
+
+        saver.keep_last = 2
+        result = saver.compact()
+
+        self.assertEqual(result["pruned_checkpoints"], 2)
+        self.assertEqual(len(self.checkpoint_ids(saver, "t1")), 2)
+
+    def test_compact_gives_free_pages_back(self):
+        saver = self.saver(idle_ttl=0)
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"messages": "x" * 100_000}
+        saver.put(
+            {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}},
+            checkpoint,
+            {},
+            {},
+        )
+
+        saver.compact()
+
+        self.assertEqual(saver.conn.execute("PRAGMA freelist_count").fetchone()[0], 0)
+        self.assertEqual(saver.stats()["checkpoints"], 0)
+
+    def test_existing_database_is_switched_to_incremental_vacuum(self):
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("CREATE TABLE legacy (id INTEGER)")
+        connection.close()
+
+        saver = self.saver()
+
+        self.assertEqual(
+            saver.conn.execute("PRAGMA auto_vacuum").fetchone()[0],
+            AUTO_VACUUM_INCREMENTAL,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
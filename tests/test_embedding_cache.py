@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from starter.mcp_servers.embedding_cache import EmbeddingCache
+
+
+class CountingEmbeddingFunction:
+    """Embeds a text by its length and counts the embedded texts."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def __call__(self, input):
+        self.embedded.extend(input)
+        return [[float(len(text)), 1.0] for text in input]
+
+
+class EmbeddingCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "embedding_cache.db")
+
+    def cache(self, **kwargs) -> EmbeddingCache:
+        cache = EmbeddingCache(
+            path=self.path,
+            embedding_function=CountingEmbeddingFunction(),
+            model_id="test",
+            **kwargs,
+        )
+        self.addCleanup(cache._connection.close)
+        return cache
+
+    def stored_rows(self) -> int:
+        with sqlite3.connect(self.path) as connection:
+            return connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def test_documents_are_embedded_once_across_restarts(self):
+        self.cache().embed(["a museum", "a concert"])
+
+        cache = self.cache()
+        vectors = cache.embed(["a museum", "a theatre"])
+
+        self.assertEqual(vectors[0], [8.0, 1.0])
+        self.assertEqual(cache.embedding_function.embedded, ["a theatre"])
+        self.assertEqual(self.stored_rows(), 3)
+
+    def test_query_embeddings_stay_in_memory(self):
+        cache = self.cache(max_query_entries=2)
+
+        cache.embed_queries(["first", "second"])
+        cache.embed_queries(["second", "third"])
+        cache.embed_queries(["first"])
+
+        self.assertEqual(self.stored_rows(), 0)
+        self.assertEqual(
+            cache.embedding_function.embedded, ["first", "second", "third", "first"]
+        )
+        self.assertEqual(cache.stats()["query_entries"], 2)
+        self.assertEqual(cache.stats()["query_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from starter.agentic.chat_interface import print_status
+from starter.agentic.gateway import ChatGateway, SessionNotFoundError
+
+
+class FakeAgent:
+    """Echoes every user message and ends the chat on an empty one."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.quiet = None
+
+    async def start_chat(self, chat_interface, quiet=False, **kwargs):
+        self.quiet = quiet
+        if self.fail:
+            await chat_interface.read_message("I was unable to validate you.")
+            return {"ticket_id": None}
+
+        while (message := await chat_interface.next_message()) is not None:
+            await chat_interface.read_message(f"echo {message}")
+        return {"ticket_id": "ticket"}
+
+    async def aclose(self):
+        pass
+
+
+class ChatGatewayTest(unittest.IsolatedAsyncioTestCase):
+    async def collect(self, gateway: ChatGateway, thread_id: str) -> list[dict]:
+        return [event async for event in gateway.events(thread_id)]
+
+    async def test_session_that_ends_right_away_can_still_be_streamed(self):
+        gateway = ChatGateway(FakeAgent(fail=True), end_grace=5)
+        session = gateway.open_session("cultpass", "u1")
+        await asyncio.sleep(0.01)
+
+        self.assertIn(session.thread_id, gateway.sessions)
+        events = await self.collect(gateway, session.thread_id)
+        await session.task
+
+        self.assertEqual([event["type"] for event in events], ["message", "end"])
+        self.assertNotIn(session.thread_id, gateway.sessions)
+
+    async def test_ended_session_is_dropped_after_the_grace_period(self):
+        gateway = ChatGateway(FakeAgent(fail=True), end_grace=0.01)
+        session = gateway.open_session("cultpass", "u1")
+
+        await session.task
+
+        self.assertNotIn(session.thread_id, gateway.sessions)
+
+    async def test_messages_are_answered_until_the_session_is_closed(self):
+        agent = FakeAgent()
+        gateway = ChatGateway(agent, end_grace=5)
+        session = gateway.open_session("cultpass", "u1")
+
+        gateway.send_message(session.thread_id, "hello")
+        gateway.close_session(session.thread_id)
+        events = await self.collect(gateway, session.thread_id)
+        await session.task
+
+        self.assertEqual(events[0], {"type": "message", "content": "echo hello"})
+        self.assertEqual(events[-1], {"type": "end", "ticket_id": "ticket"})
+        self.assertTrue(agent.quiet)
+        with self.assertRaises(SessionNotFoundError):
+            gateway.send_message(session.thread_id, "too late")
+
+    async def test_ended_session_rejects_messages_and_can_be_reopened(self):
+        gateway = ChatGateway(FakeAgent(fail=True), end_grace=5)
+        session = gateway.open_session("cultpass", "u1", thread_id="thread")
+        await asyncio.sleep(0.01)
+
+        with self.assertRaises(SessionNotFoundError):
+            gateway.send_message("thread", "hello")
+        reopened = gateway.open_session("cultpass", "u1", thread_id="thread")
+
+        self.assertIsNot(reopened, session)
+        await gateway.aclose()
+
+    async def test_fields_of_the_wrong_type_are_rejected(self):
+        gateway = ChatGateway(FakeAgent())
+
+        for fields in [
+            {"account_id": 1, "external_user_id": "u1"},
+            {"account_id": "cultpass", "external_user_id": ["u1"]},
+            {"account_id": "cultpass", "external_user_id": ""},
+            {"account_id": "cultpass", "external_user_id": "u1", "ticket_id": 7},
+        ]:
+            with self.assertRaises(ValueError):
+                gateway.open_session(**fields)
+        self.assertEqual(gateway.sessions, {})
+
+
+class PrintStatusTest(unittest.TestCase):
+    def test_quiet_chats_log_instead_of_printing(self):
+        with (
+            mock.patch("builtins.print") as print_,
+            self.assertLogs("starter.agentic.chat_interface", "INFO") as logs,
+        ):
+            print_status({"configurable": {"quiet": True}}, "Synchronizing...\n")
+
+        print_.assert_not_called()
+        self.assertEqual(logs.records[0].getMessage(), "Synchronizing...")
+
+
+if __name__ == "__main__":
+    unittest.main()
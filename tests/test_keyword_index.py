@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from starter.mcp_servers.keyword_index import (
+    KeywordIndex,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+
+class KeywordIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "keyword_index.db")
+
+    def index(self) -> KeywordIndex:
+        index = KeywordIndex(self.path)
+        self.addCleanup(index._connection.close)
+        return index
+
+    def test_rare_terms_rank_first(self):
+        index = self.index()
+        index.upsert(
+            "udahub",
+            [
+                ("a1", "cultpass", "How to cancel a subscription"),
+                ("a2", "cultpass", "Refund for a cancelled event ticket"),
+                ("a3", "cultpass", "How to change the subscription plan"),
+            ],
+        )
+
+        self.assertEqual(index.search("udahub", "refund ticket", 3), ["a2"])
+        self.assertEqual(index.search("udahub", "cancel subscription", 3)[0], "a1")
+
+    def test_search_is_limited_to_the_account(self):
+        index = self.index()
+        index.upsert(
+            "udahub",
+            [("a1", "cultpass", "Refund policy"), ("b1", "other", "Refund policy")],
+        )
+
+        self.assertEqual(index.search("udahub", "refund", 5, "other"), ["b1"])
+        self.assertEqual(sorted(index.search("udahub", "refund", 5)), ["a1", "b1"])
+
+    def test_upsert_replaces_and_delete_removes_documents(self):
+        index = self.index()
+        index.upsert("udahub", [("a1", "cultpass", "Refund policy")])
+        index.upsert("udahub", [("a1", "cultpass", "Opening hours")])
+
+        self.assertEqual(index.search("udahub", "refund", 5), [])
+        self.assertEqual(index.search("udahub", "hours", 5), ["a1"])
+        index.delete("udahub", ["a1"])
+        self.assertEqual(index.count("udahub"), 0)
+
+    def test_built_marker_survives_restarts_of_empty_collections(self):
+        self.index().mark_built("udahub")
+
+        index = self.index()
+
+        self.assertTrue(index.is_built("udahub"))
+        self.assertFalse(index.is_built("cultpass"))
+        self.assertEqual(index.count("udahub"), 0)
+
+
+class ReciprocalRankFusionTest(unittest.TestCase):
+    def test_documents_ranked_high_in_both_rankings_win(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]])
+
+        self.assertEqual(fused[:2], ["b", "a"])
+        self.assertEqual(set(fused), {"a", "b", "c", "d"})
+
+    def test_tokens_are_case_folded_words(self):
+        self.assertEqual(
+            tokenize("Rückerstattung, REFUND!"), ["rückerstattung", "refund"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import re
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from starter.data.models.udahub import Base, Knowledge
+from starter.mcp_servers.chroma_registry import ChromaRegistry
+from starter.mcp_servers.embedding_cache import EmbeddingCache
+from starter.mcp_servers.keyword_index import KeywordIndex
+from starter.mcp_servers.query_cache import QueryCache
+
+DATA_DIR = tempfile.mkdtemp(prefix="knowledgebase_test_")
+kb = None
+
+
+def setUpModule():
+    # The server opens its stores on import, so point them at a scratch
+    # directory before it is imported.
+    global kb
+    os.environ["CHROMA_DB_PATH"] = os.path.join(DATA_DIR, "chroma")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(DATA_DIR, "embedding_cache.db")
+    os.environ["KEYWORD_INDEX_PATH"] = os.path.join(DATA_DIR, "keyword_index.db")
+    from starter.mcp_servers import knowledgebase_mcp as kb
+
+
+class FakeEmbeddingFunction:
+    """Embeds a text by its length, so the tests need no embedding model."""
+
+    def __call__(self, input):
+        return [[float(len(text)), 1.0, 0.0] for text in input]
+
+
+ARTICLES = [
+    ("a1", "cultpass", "Refunds", "Refunds are issued within five days."),
+    ("a2", "cultpass", "Opening hours", "Support is open from nine to five."),
+    ("b1", "museum co", "Refunds", "Museum tickets cannot be refunded."),
+]
+
+
+class ShardingTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(dir=DATA_DIR)
+        database_url = f"sqlite:///{self.dir}/udahub.db"
+        engine = create_engine(database_url)
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(
+                Knowledge(
+                    article_id=article_id,
+                    account_id=account_id,
+                    title=title,
+                    content=content,
+                )
+                for article_id, account_id, title, content in ARTICLES
+            )
+            session.commit()
+        engine.dispose()
+
+        self.patch("UDAHUB_DB_PATH", database_url)
+        self.patch("chroma", ChromaRegistry(os.path.join(self.dir, "chroma")))
+        self.patch("query_cache", QueryCache(max_entries=16, ttl_seconds=600))
+        self.patch(
+            "keyword_index", KeywordIndex(os.path.join(self.dir, "keyword_index.db"))
+        )
+        self.patch(
+            "embedding_cache",
+            EmbeddingCache(
+                path=os.path.join(self.dir, "embedding_cache.db"),
+                embedding_function=FakeEmbeddingFunction(),
+            ),
+        )
+
+    def patch(self, name: str, value):
+        original = getattr(kb, name)
+        setattr(kb, name, value)
+        self.addCleanup(setattr, kb, name, original)
+
+    def query(self, account_id: str, mode: str = "hybrid") -> list[str]:
+        entries = kb.query_collection(
+            "udahub", account_id, ["refunds"], 5, kb.udahub_entries, mode
+        )[0]
+        return sorted(entry["article_id"] for entry in entries)
+
+    def test_each_account_is_stored_in_its_own_shard(self):
+        kb.sync_udahub_collection(kb.KnowledgeBaseSyncOptions())
+
+        shards = {
+            shard.metadata["account_id"]: shard.count()
+            for shard in kb.shard_collections("udahub")
+        }
+
+        self.assertEqual(shards, {"cultpass": 2, "museum co": 1})
+        self.assertEqual(kb.chroma.collection("udahub").count(), 0)
+
+    def test_queries_only_see_the_documents_of_their_account(self):
+        kb.sync_udahub_collection(kb.KnowledgeBaseSyncOptions())
+
+        self.assertEqual(self.query("museum co"), ["b1"])
+        self.assertEqual(self.query("museum co", mode="vector"), ["b1"])
+        self.assertEqual(self.query("cultpass", mode="keyword"), ["a1"])
+        self.assertEqual(self.query("unknown"), [])
+        self.assertIsNone(kb.storage_collection("udahub", "unknown", create=False))
+
+    def test_unsharded_documents_are_moved_into_shards(self):
+        collection = kb.chroma.collection("udahub")
+        records = [
+            kb.knowledge_record(
+                Knowledge(
+                    article_id=article_id,
+                    account_id=account_id,
+                    title=title,
+                    content=content,
+                )
+            )
+            for article_id, account_id, title, content in ARTICLES
+        ]
+        ids, documents, metadatas = zip(*records)
+        collection.add(
+            ids=list(ids),
+            documents=list(documents),
+            metadatas=[kb.stored_metadata(metadata) for metadata in metadatas],
+            embeddings=kb.embedding_cache.embed(documents),
+        )
+
+        self.assertEqual(kb.migrate_to_shards("udahub", batch_size=2), 3)
+
+        self.assertEqual(collection.count(), 0)
+        self.assertEqual(
+            kb.storage_collection("udahub", "cultpass").get(include=[])["ids"],
+            ["knowledge_a1", "knowledge_a2"],
+        )
+
+    def test_shard_names_are_valid_and_distinct(self):
+        names = {
+            kb.shard_name("udahub", account_id)
+            for account_id in ["museum co", "museum-co", "museum/co", "x" * 80]
+        }
+
+        self.assertEqual(len(names), 4)
+        for name in names:
+            self.assertLessEqual(len(name), kb.MAX_COLLECTION_NAME_LENGTH)
+            self.assertRegex(
+                name, re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9_-]*[a-zA-Z0-9]$")
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from starter.data.models.cultpass import Base, Experience
+from starter.mcp_servers.chroma_registry import ChromaRegistry
+from starter.mcp_servers.embedding_cache import EmbeddingCache
+from starter.mcp_servers.query_cache import QueryCache
+
+DATA_DIR = tempfile.mkdtemp(prefix="knowledgebase_test_")
+kb = None
+
+
+def setUpModule():
+    # The server opens its stores on import, so point them at a scratch
+    # directory before it is imported.
+    global kb
+    os.environ["CHROMA_DB_PATH"] = os.path.join(DATA_DIR, "chroma")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(DATA_DIR, "embedding_cache.db")
+    os.environ["KEYWORD_INDEX_PATH"] = os.path.join(DATA_DIR, "keyword_index.db")
+    from starter.mcp_servers import knowledgebase_mcp as kb
+
+
+class FakeEmbeddingFunction:
+    """Embeds a text by its length, so the tests need no embedding model."""
+
+    def __call__(self, input):
+        return [[float(len(text)), 1.0, 0.0] for text in input]
+
+
+class DeltaSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(dir=DATA_DIR)
+        self.database_url = f"sqlite:///{self.dir}/cultpass.db"
+        engine = create_engine(self.database_url)
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(
+                Experience(
+                    experience_id=f"exp{i}",
+                    title=f"Experience {i}",
+                    description=f"A guided museum tour number {i}",
+                    location="Lisbon, Portugal",
+                    when=datetime(2030, 1, 1) + timedelta(days=i),
+                    slots_available=10,
+                    is_premium=False,
+                )
+                for i in range(5)
+            )
+            session.commit()
+        engine.dispose()
+
+        self.patch("CULTPASS_DB_PATH", self.database_url)
+        self.patch("chroma", ChromaRegistry(os.path.join(self.dir, "chroma")))
+        self.patch("query_cache", QueryCache(max_entries=16, ttl_seconds=600))
+        self.patch(
+            "embedding_cache",
+            EmbeddingCache(
+                path=os.path.join(self.dir, "embedding_cache.db"),
+                embedding_function=FakeEmbeddingFunction(),
+            ),
+        )
+
+    def patch(self, name: str, value):
+        original = getattr(kb, name)
+        setattr(kb, name, value)
+        self.addCleanup(setattr, kb, name, original)
+
+    def query(self) -> list[dict]:
+        return kb.query_collection(
+            "cultpass", None, ["museum tour"], 3, kb.cultpass_entries
+        )[0]
+
+    def test_idle_delta_sync_keeps_cached_queries(self):
+        kb.sync_cultpass_collection(kb.KnowledgeBaseSyncOptions())
+        self.query()
+        self.assertEqual(kb.query_cache.stats()["entries"], 1)
+
+        report = kb.sync_cultpass_collection(kb.KnowledgeBaseSyncOptions())
+
+        self.assertEqual(report["mode"], "delta")
+        self.assertEqual(report["upserted"], 0)
+        self.assertEqual(kb.query_cache.version("cultpass"), 1)
+        self.query()
+        self.assertEqual(kb.query_cache.stats()["hits"], 1)
+
+    def test_changed_row_invalidates_cached_queries(self):
+        kb.sync_cultpass_collection(kb.KnowledgeBaseSyncOptions())
+        self.query()
+
+        engine = create_engine(self.database_url)
+        with Session(engine) as session:
+            session.get(Experience, "exp0").slots_available = 0
+            session.commit()
+        engine.dispose()
+        report = kb.sync_cultpass_collection(kb.KnowledgeBaseSyncOptions())
+
+        self.assertEqual(report["upserted"], 1)
+        self.assertEqual(kb.query_cache.version("cultpass"), 2)
+        self.assertEqual(kb.query_cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
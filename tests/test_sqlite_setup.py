@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import unittest
+
+from starter.data.sqlite_setup import SerialWriter
+
+
+class SerialWriterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_writes_run_in_order_on_one_thread(self):
+        writer = SerialWriter("test")
+        threads = []
+
+        def write(i: int) -> int:
+            threads.append(threading.current_thread())
+            return i
+
+        results = await asyncio.gather(*(writer.arun(write, i) for i in range(5)))
+
+        self.assertEqual(results, [0, 1, 2, 3, 4])
+        self.assertEqual(len(set(threads)), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    async def test_full_queue_does_not_block_the_event_loop(self):
+        writer = SerialWriter("test", max_pending=1)
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking_write():
+            started.set()
+            release.wait(5)
+
+        first = writer.submit(blocking_write)
+        await asyncio.to_thread(started.wait, 5)
+        # Fills the only slot of the queue while the first write is running.
+        second = writer.submit(lambda: "second")
+        third = asyncio.create_task(writer.arun(lambda: "third"))
+
+        # The loop keeps running other tasks while `third` waits for a slot.
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        await asyncio.sleep(0.05)
+        self.assertLess(loop.time() - started_at, 1)
+        self.assertFalse(third.done())
+        release.set()
+
+        self.assertEqual(await third, "third")
+        self.assertIsNone(first.result())
+        self.assertEqual(second.result(), "second")
+
+    async def test_exceptions_are_raised_to_the_caller(self):
+        writer = SerialWriter("test")
+
+        def fail():
+            raise ValueError("broken")
+
+        with self.assertRaises(ValueError):
+            await writer.arun(fail)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from langchain_core.messages import AIMessage, HumanMessage
+from sqlalchemy import create_engine
+
+from starter.agentic.chat_interface import AsyncListChatInterface
+from starter.agentic.nodes.enrichment import enrichment_node
+from starter.data import udahub_db
+from starter.data.models.udahub import Base
+
+
+class TicketHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        path = Path(self.dir.name, "udahub.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        engine.dispose()
+
+        udahub_db.dispose_engine()
+        patcher = mock.patch.object(udahub_db, "UDAHUB_DB_PATH", path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(udahub_db.dispose_engine)
+
+        self.ticket_id = udahub_db.create_ticket(
+            account_id="cultpass",
+            user_id="user",
+            channel="chat",
+            summary="summary",
+            status="open",
+            tags=[],
+        )
+
+    def add_messages(self, count: int, start: int = 0):
+        udahub_db.add_messages_to_ticket(
+            self.ticket_id,
+            [
+                (HumanMessage if i % 2 == 0 else AIMessage)(
+                    content=f"message {i}", id=f"m{i}"
+                )
+                for i in range(start, start + count)
+            ],
+        )
+
+    def test_messages_are_numbered_in_the_order_they_are_stored(self):
+        self.add_messages(3)
+        self.add_messages(2, start=3)
+        # An updated message keeps its position.
+        udahub_db.add_messages_to_ticket(
+            self.ticket_id, [AIMessage(content="edited", id="m1")]
+        )
+
+        messages = udahub_db.get_messages_for_ticket(self.ticket_id)
+
+        self.assertEqual(
+            [(m["message_id"], m["sequence"]) for m in messages],
+            [("m0", 1), ("m1", 2), ("m2", 3), ("m3", 4), ("m4", 5)],
+        )
+        self.assertEqual(messages[1]["content"], "edited")
+
+    def test_pages_are_read_newest_first(self):
+        self.add_messages(5)
+
+        first = udahub_db.get_ticket_messages_page(self.ticket_id, limit=2)
+        second = udahub_db.get_ticket_messages_page(
+            self.ticket_id, limit=2, before_sequence=first["before_sequence"]
+        )
+        last = udahub_db.get_ticket_messages_page(
+            self.ticket_id, limit=2, before_sequence=second["before_sequence"]
+        )
+
+        self.assertEqual([m["sequence"] for m in first["messages"]], [4, 5])
+        self.assertEqual([m["sequence"] for m in second["messages"]], [2, 3])
+        self.assertEqual([m["sequence"] for m in last["messages"]], [1])
+        self.assertIsNone(last["before_sequence"])
+
+    def enrich(self, history_window: int) -> tuple[dict, list[str]]:
+        shown = []
+        chat_interface = AsyncListChatInterface([])
+
+        async def read_message(message: str):
+            shown.append(message)
+
+        chat_interface.read_message = read_message
+        config = {
+            "configurable": {
+                "ticket_id": self.ticket_id,
+                "history_window": history_window,
+                "chat_interface": chat_interface,
+            }
+        }
+        with mock.patch("builtins.print"):
+            state = asyncio.run(enrichment_node({}, config))
+        return state, shown
+
+    def test_unsummarized_messages_are_loaded_beyond_the_window(self):
+        self.add_messages(7)
+
+        state, shown = self.enrich(history_window=2)
+
+        self.assertEqual(len(state["messages"]), 7)
+        self.assertEqual(state["summarized_messages_count"], 0)
+        # Only the window is shown to the user again.
+        self.assertEqual(shown, ["message 5", "> message 6"])
+
+    def test_summarized_messages_are_not_paged_in(self):
+        self.add_messages(7)
+        udahub_db.save_conversation_summary(self.ticket_id, "earlier", "m3")
+
+        state, _ = self.enrich(history_window=2)
+
+        self.assertEqual(state["conversation_summary"], "earlier")
+        # Pages are read until the summary boundary, m3 is part of the summary.
+        self.assertEqual(
+            [message.id for message in state["messages"]], ["m3", "m4", "m5", "m6"]
+        )
+        self.assertEqual(state["summarized_messages_count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
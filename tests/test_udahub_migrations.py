@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+
+from starter.data.models.udahub import Base
+from starter.data.udahub_migrations import (
+    MIGRATIONS,
+    check_query_plans,
+    get_schema_version,
+    migrate,
+)
+
+# The schema of udahub.db before it was versioned.
+UNVERSIONED_SCHEMA = """
+CREATE TABLE tickets (
+    ticket_id VARCHAR PRIMARY KEY,
+    account_id VARCHAR NOT NULL,
+    user_id VARCHAR NOT NULL,
+    channel VARCHAR,
+    summary VARCHAR,
+    created_at DATETIME
+);
+CREATE TABLE ticket_messages (
+    message_id VARCHAR PRIMARY KEY,
+    ticket_id VARCHAR NOT NULL,
+    role VARCHAR NOT NULL,
+    content TEXT,
+    created_at DATETIME
+);
+CREATE TABLE knowledge (
+    article_id VARCHAR PRIMARY KEY,
+    account_id VARCHAR NOT NULL,
+    title VARCHAR NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT,
+    created_at DATETIME,
+    updated_at DATETIME
+);
+INSERT INTO ticket_messages VALUES
+    ('m3', 't1', 'ai', 'third', '2025-01-01 10:02:00'),
+    ('m1', 't1', 'user', 'first', '2025-01-01 10:00:00'),
+    ('m2', 't1', 'ai', 'second', '2025-01-01 10:01:00'),
+    ('n1', 't2', 'user', 'other', '2025-01-01 09:00:00');
+"""
+
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self.dir.name, 'udahub.db')}"
+        )
+        self.addCleanup(self.engine.dispose)
+
+    def test_unversioned_database_is_upgraded_in_place(self):
+        with self.engine.begin() as connection:
+            connection.connection.executescript(UNVERSIONED_SCHEMA)
+
+        applied = migrate(self.engine)
+
+        self.assertEqual(applied, [migration.version for migration in MIGRATIONS])
+        with self.engine.connect() as connection:
+            self.assertEqual(get_schema_version(connection), MIGRATIONS[-1].version)
+            sequences = connection.exec_driver_sql(
+                "SELECT message_id, sequence FROM ticket_messages "
+                "ORDER BY ticket_id, sequence"
+            ).all()
+            ticket_columns = [
+                row[1]
+                for row in connection.exec_driver_sql("PRAGMA table_info(tickets)")
+            ]
+        # Messages are numbered per ticket in the order they were created.
+        self.assertEqual(
+            [tuple(row) for row in sequences],
+            [("m1", 1), ("m2", 2), ("m3", 3), ("n1", 1)],
+        )
+        self.assertIn("conversation_summary", ticket_columns)
+        self.assertIn("summarized_until_sequence", ticket_columns)
+
+    def test_migrations_run_once(self):
+        Base.metadata.create_all(self.engine)
+
+        self.assertEqual(len(migrate(self.engine)), len(MIGRATIONS))
+        self.assertEqual(migrate(self.engine), [])
+
+    def test_hot_queries_use_their_indexes(self):
+        Base.metadata.create_all(self.engine)
+        migrate(self.engine)
+
+        results = check_query_plans(self.engine)
+
+        self.assertTrue(all(result["ok"] for result in results), results)
+        pages = [r for r in results if r["query"] == "page of ticket messages"]
+        self.assertEqual(
+            pages[0]["expected_index"], "ix_ticket_messages_ticket_id_sequence"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest import mock
+
+from langchain_core.tools import StructuredTool
+
+from starter.agentic.identity_cache import IdentityCache
+from starter.agentic.nodes import validation
+
+
+def fake_tool(name: str, author: str, tags: list[str], read_only: bool, handler):
+    async def call(user: dict) -> str:
+        return json.dumps(handler(user))
+
+    return StructuredTool.from_function(
+        coroutine=call,
+        name=name,
+        description=name,
+        metadata={
+            "readOnlyHint": read_only,
+            "_meta": {"author": author, "_fastmcp": {"tags": tags}},
+        },
+    )
+
+
+class ValidationTools:
+    """Customer and UDA Hub validation tools backed by dicts."""
+
+    def __init__(self, customer_users: dict, udahub_users: dict):
+        self.customer_users = customer_users
+        self.udahub_users = udahub_users
+        self.calls = []
+
+    def customer(self, user: dict):
+        self.calls.append("get_cultpass_user")
+        return self.customer_users.get(user["user_id"], {"error": "not found"})
+
+    def find(self, user: dict):
+        self.calls.append("find_udahub_user")
+        return self.udahub_users.get(user["external_user_id"])
+
+    def create(self, user: dict):
+        self.calls.append("create_udahub_user")
+        created = {"user_id": f"uda-{user['external_user_id']}"}
+        self.udahub_users[user["external_user_id"]] = created
+        return created
+
+    def tools(self) -> list:
+        return [
+            fake_tool(
+                "get_cultpass_user",
+                "cultpass",
+                ["validation", "user"],
+                True,
+                self.customer,
+            ),
+            fake_tool("find_udahub_user", "UDAHub", ["validation"], True, self.find),
+            fake_tool(
+                "create_udahub_user", "UDAHub", ["validation"], False, self.create
+            ),
+        ]
+
+
+class IdentityCacheTest(unittest.TestCase):
+    def test_entries_expire_after_the_ttl(self):
+        cache = IdentityCache(max_entries=8, ttl_seconds=60)
+        cache.put_user("cultpass", "u1", {"udahub_user_id": "uda-u1"})
+
+        self.assertEqual(cache.get_user("cultpass", "u1"), {"udahub_user_id": "uda-u1"})
+        with mock.patch("time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get_user("cultpass", "u1"))
+
+    def test_invalidate_account_drops_its_users(self):
+        cache = IdentityCache(max_entries=8, ttl_seconds=60)
+        cache.put_account("cultpass", {"account_id": "cultpass"})
+        cache.put_user("cultpass", "u1", {})
+        cache.put_user("cultpass", "u2", {})
+        cache.put_user("other", "u1", {})
+
+        cache.invalidate_user("cultpass", "u2")
+        self.assertIsNone(cache.get_user("cultpass", "u2"))
+        cache.invalidate_account("cultpass")
+
+        self.assertIsNone(cache.get_account("cultpass"))
+        self.assertIsNone(cache.get_user("cultpass", "u1"))
+        self.assertEqual(cache.get_user("other", "u1"), {})
+
+
+class DeterministicValidationTest(unittest.TestCase):
+    def validate(self, tools: ValidationTools, external_user_id: str):
+        return asyncio.run(
+            validation.validate_user_deterministic(
+                tools.tools(), "cultpass", external_user_id
+            )
+        )
+
+    def test_known_user_is_validated(self):
+        tools = ValidationTools(
+            {"u1": {"full_name": "Ada"}}, {"u1": {"user_id": "uda-u1"}}
+        )
+
+        result = self.validate(tools, "u1")
+
+        self.assertTrue(result.validation_successfull)
+        self.assertEqual(result.uda_hub_user_id, "uda-u1")
+        self.assertEqual(result.full_name, "Ada")
+        self.assertFalse(result.uda_hub_user_created)
+
+    def test_missing_udahub_user_is_created(self):
+        tools = ValidationTools({"u1": {"full_name": "Ada"}}, {})
+
+        result = self.validate(tools, "u1")
+
+        self.assertTrue(result.validation_successfull)
+        self.assertTrue(result.uda_hub_user_created)
+        self.assertIn("create_udahub_user", tools.calls)
+
+    def test_unknown_and_blocked_users_fail(self):
+        tools = ValidationTools({"u2": {"full_name": "Bob", "is_blocked": True}}, {})
+
+        self.assertFalse(self.validate(tools, "u1").validation_successfull)
+        self.assertFalse(self.validate(tools, "u2").validation_successfull)
+        self.assertNotIn("create_udahub_user", tools.calls)
+
+
+class ValidationNodeTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = IdentityCache(max_entries=8, ttl_seconds=60)
+        self.cache.put_account("cultpass", {"account_name": "CultPass"})
+        patcher = mock.patch.object(validation, "identity_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_node(self, tools: ValidationTools) -> dict:
+        state = {"user": {"account_id": "cultpass", "external_user_id": "u1"}}
+        config = {
+            "configurable": {"mcp_tools": tools.tools(), "llm": None},
+        }
+        return asyncio.run(validation.validation_node(state, config))
+
+    def test_cached_user_skips_validation(self):
+        tools = ValidationTools({"u1": {"full_name": "Ada"}}, {})
+
+        first = self.run_node(tools)
+        calls = len(tools.calls)
+        second = self.run_node(tools)
+
+        self.assertTrue(second["is_validated"])
+        self.assertEqual(len(tools.calls), calls)
+        self.assertEqual(second["user"]["udahub_user_id"], "uda-u1")
+        self.assertTrue(first["user"]["udahub_user_created"])
+        self.assertFalse(second["user"]["udahub_user_created"])
+
+    def test_invalidated_user_is_validated_again(self):
+        tools = ValidationTools({"u1": {"full_name": "Ada"}}, {})
+        self.run_node(tools)
+
+        tools.customer_users["u1"]["is_blocked"] = True
+        self.cache.invalidate_user("cultpass", "u1")
+        result = self.run_node(tools)
+
+        self.assertTrue(result["terminate_chat"])
+        self.assertIsNone(self.cache.get_user("cultpass", "u1"))
+
+
+if __name__ == "__main__":
+    unittest.main()